@@ -7,24 +7,53 @@ Description: A tool to automate UK residency and absence compliance checks.
 """
 
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox
 from datetime import datetime
 import ttkbootstrap as tb 
 from ttkbootstrap.widgets import DateEntry
-from logic import Trip, LogicEngine
-import json
+from logic import Trip, TripTable, LogicEngine, ResidencyState
+from store import TripStore
+from storage import TripDatabase, load_trips, save_trips
+from importer import import_file, parse_date
+from scenarios import RANKINGS, compare_scenarios, rank
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import instrumentation
+from functools import lru_cache
+
+@lru_cache(maxsize=8192)
+def trip_row(t):
+    """Treeview (values, tags) for a trip. Trips are frozen, so each is formatted once."""
+    kind = f"PLAN: {t.scenario}" if t.scenario else "WHAT-IF" if t.is_what_if else "CONFIRMED"
+    return ((t.departure.strftime("%d/%m/%Y"), t.return_date.strftime("%d/%m/%Y"), t.daysAbsent, kind),
+            ('hypothetical',) if t.is_what_if else ())
 
 class BNOAdvancedTracker:
-    def __init__(self, root):
+    DEBOUNCE_MS = 150 # quiet period before a burst of edits triggers a recompute
+    POLL_MS = 30      # how often the Tk loop checks on the worker
+    TREE_WINDOW = 500 # longer histories only keep this many rows in the Treeview
+
+    def __init__(self, root, db_file="trips.db"):
         self.root = root
         self.root.title("BNO Settlement & Citizenship Suite (2026) ")
         self.root.geometry("1000x1200")
         
         #construtors
         self.engine = LogicEngine()
-        self.trips = []
+        self.trips = TripStore()
+        self.state = ResidencyState() # incremental stats, kept in step with self.trips
         self.style = tb.Style()
-        self.editing_index = None
+        self.editing_id = None # TripStore ID of the trip being edited
+        self.db = None # TripDatabase; every edit is written through (None = JSON only)
+
+        #background compute (see refresh_dashboard)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.scenario_executor = ThreadPoolExecutor(max_workers=1) # keeps comparisons off the dashboard worker
+        self.generation = 0
+        self.pending_refresh = None
+        self.running_job = None
+        self.refresh_counts = {} # instrumentation counters when the current refresh started
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         #view options
         self.font_scale = 1.0  # 1.0 = 100% zoom
@@ -34,12 +63,18 @@ class BNOAdvancedTracker:
         self.setup_ui()
     #   self.load_hardcoded_data()
         self.refresh_dashboard()
-        self.load_data()
+        if db_file: self.open_database(db_file)
+        else: self.load_data()
 
     def setup_ui(self):
         self.menu_bar = tk.Menu(self.root)
         self.root.config(menu=self.menu_bar)
 
+        #  File Menu
+        self.file_menu = tk.Menu(self.menu_bar, tearoff=0)
+        self.menu_bar.add_cascade(label="File", menu=self.file_menu)
+        self.file_menu.add_command(label="Import Trips (CSV / JSON Lines)...", command=self.import_trips)
+
         #  View Menu
         self.view_menu = tk.Menu(self.menu_bar, tearoff=0)
         self.menu_bar.add_cascade(label="View", menu=self.view_menu)
@@ -55,6 +90,15 @@ class BNOAdvancedTracker:
         self.root.bind("<Control-plus>", self.zoom_in)  
         self.root.bind("<Control-minus>", self.zoom_out) 
         self.root.bind("<Control-0>", self.reset_zoom)   
+        # Hidden: adds the Diagnostics menu and opens the profiling panel
+        self.root.bind("<Control-Shift-D>", self.show_diagnostics)
+        self.diag_menu = None
+
+        #  "Tools" menu
+        self.tools_menu = tk.Menu(self.menu_bar, tearoff=0)
+        self.menu_bar.add_cascade(label="Tools", menu=self.tools_menu)
+        self.tools_menu.add_command(label="Travel Budget Calendar", command=self.show_budget_calendar)
+        self.tools_menu.add_command(label="Compare Scenarios", command=self.show_scenarios)
 
         #  "Help" menu
         self.help_menu = tk.Menu(self.menu_bar, tearoff=0)
@@ -92,16 +136,30 @@ class BNOAdvancedTracker:
         self.what_if_var = tk.BooleanVar(value=False)
         tb.Checkbutton(trip_frame, text="What-If?", variable=self.what_if_var).grid(row=0, column=4, padx=5)
 
+        # Named scenario: alternative plans that are compared side by side, never added together
+        tb.Label(trip_frame, text="Scenario:").grid(row=1, column=0, padx=5, pady=(8, 0), sticky="e")
+        self.scenario_entry = tb.Combobox(trip_frame, width=24)
+        self.scenario_entry.grid(row=1, column=1, columnspan=3, padx=5, pady=(8, 0), sticky="w")
+
         self.add_btn = tb.Button(trip_frame, text="Add Trip", command=self.add_trip, bootstyle="success")
         self.add_btn.grid(row=0, column=5, padx=5)
         tb.Button(trip_frame, text="Edit", command=self.load_edit, bootstyle="info-outline").grid(row=0, column=6, padx=2)
         tb.Button(trip_frame, text="Delete", command=self.delete_trip, bootstyle="danger-outline").grid(row=0, column=7, padx=2)
 
-        self.tree = tb.Treeview(self.root, columns=("S", "E", "D", "T"), show='headings', height=10)
+        tree_frame = tb.Frame(self.root)
+        tree_frame.pack(pady=0, padx=20, fill="x")
+        self.tree = tb.Treeview(tree_frame, columns=("S", "E", "D", "T"), show='headings', height=10)
         for col, head in zip(("S", "E", "D", "T"), ("Departure", "Return", "Days", "Type")):
             self.tree.heading(col, text=head, anchor = "center")
             self.tree.column(col, anchor="center", width=120)
-        self.tree.pack(pady=0, padx=20, fill="x")
+        # The scrollbar always spans the whole history, even when only a window of it is rendered
+        self.tree_scroll = tb.Scrollbar(tree_frame, orient="vertical", command=self.scroll_tree)
+        self.tree.configure(yscrollcommand=self.on_tree_scroll)
+        self.tree_scroll.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="x", expand=True)
+        self.tree_rows = {}   # iid -> Trip as currently rendered
+        self.tree_start = 0   # position of the first rendered trip (windowed mode)
+        self.tree_shift_pending = False
         self.tree.tag_configure('hypothetical', foreground='orange')
         self.style.configure(
             "Treeview",
@@ -150,26 +208,63 @@ class BNOAdvancedTracker:
                 bootstyle="info-outline", width=8).pack(side="left", padx=2)
 
     def refresh_dashboard(self):
+        """Controller: Debounces bursts of changes into a single background recompute."""
+        self.generation += 1 # any result from an older generation is now stale
+        if self.pending_refresh is not None:
+            self.root.after_cancel(self.pending_refresh)
+        self.pending_refresh = self.root.after(self.DEBOUNCE_MS, self.start_compute, self.generation)
+
+    def start_compute(self, generation):
         """Controller: Orchestrates data flow between Logic and UI."""
+        self.pending_refresh = None
+        self.refresh_counts = instrumentation.counters()
+        with instrumentation.span("refresh.main"):
+            try:
+                # 1. Cheap logic on the main thread (incremental state)
+                visa_str = self.visa_entry.entry.get()
+                ilr_date, bc_date = self.engine.getMilestoneDates(visa_str)
+                if not ilr_date: return 
+
+                real_max, real_bc, _ = self.state.getStats(bc_date, include_what_if=False)
+                all_max, all_bc, _ = self.state.getStats(bc_date)
+
+                self.ilr_date_display.config(text=f"Earliest ILR Application: {ilr_date.strftime('%d/%m/%Y')}")
+                self.ilr_left_lbl.config(text=f"What-If Impact: +{all_max - real_max} days")
+                self.bc_left_lbl.config(text=f"What-If Impact: +{all_bc - real_bc} days")
+                self.planner_summary.config(text="Calculating…", bootstyle="secondary")
+
+                # 2. Heavy logic on the worker, against a snapshot of the trips
+                if self.running_job is not None:
+                    self.running_job.cancel() # no-op if it has already started
+                self.running_job = self.executor.submit(
+                    self.compute_dashboard, self.engine, TripTable.fromTrips(t for t in self.trips if not t.scenario),
+                    bc_date, all_max, all_bc)
+                self.root.after(self.POLL_MS, self.poll_compute, generation, self.running_job)
+            except Exception as e:
+                instrumentation.error("refresh_dashboard", e)
+                print(f"Dashboard Error: {e}")
+
+    @staticmethod
+    def compute_dashboard(engine, trips, bc_date, all_max, all_bc):
+        """Worker: runs off the Tk thread, so it must not touch any widget."""
+        with instrumentation.profiled(), instrumentation.span("refresh.worker"):
+            max_safe, limit = engine.run_sim(trips, bc_date)
+            advice = engine.get_troubleshooting_advice(all_max, all_bc, bc_date, trips)
+        return all_max, all_bc, max_safe, limit, advice
+
+    def poll_compute(self, generation, job):
+        """Main thread: waits for the worker and drops results that went stale meanwhile."""
+        if generation != self.generation or job.cancelled():
+            return
+        if not job.done():
+            self.root.after(self.POLL_MS, self.poll_compute, generation, job)
+            return
         try:
-            # 1. Logic Processing
-            visa_str = self.visa_entry.entry.get()
-            ilr_date, bc_date = self.engine.getMilestoneDates(visa_str)
-            if not ilr_date: return 
-
-            real_trips = [t for t in self.trips if not t.is_what_if]
-            real_max, real_bc, _ = self.engine.getStats(real_trips, bc_date)
-            all_max, all_bc, _ = self.engine.getStats(self.trips, bc_date)
-            max_safe, limit = self.engine.run_sim(self.trips, bc_date)
-            advice = self.engine.get_troubleshooting_advice(all_max, all_bc, bc_date, self.trips)
-
-            # 2. UI Updates
-            self.ilr_date_display.config(text=f"Earliest ILR Application: {ilr_date.strftime('%d/%m/%Y')}")
-            self.ilr_left_lbl.config(text=f"What-If Impact: +{all_max - real_max} days")
-            self.bc_left_lbl.config(text=f"What-If Impact: +{all_bc - real_bc} days")
-            
-            self.apply_UI_Styles(all_max, all_bc, max_safe, limit, advice)
+            with instrumentation.span("refresh.apply"):
+                self.apply_UI_Styles(*job.result())
+            instrumentation.end_refresh(self.refresh_counts)
         except Exception as e:
+            instrumentation.error("poll_compute", e)
             print(f"Dashboard Error: {e}")
 
     def apply_UI_Styles(self, all_max, all_bc, max_safe, limit, solutions):
@@ -204,48 +299,43 @@ class BNOAdvancedTracker:
     def add_trip(self):
         """Input Handler: Sanitizes date strings and creates Trip objects."""
         raw_s, raw_e = self.dep_entry.entry.get().strip(), self.ret_entry.entry.get().strip()
-        
-        def parse(d):
-            for fmt in ("%d/%m/%Y", "%d/%m/%y"):
-                try: return datetime.strptime(d, fmt)
-                except: continue
-            return None
 
-        s_dt, e_dt = parse(raw_s), parse(raw_e)
+        s_dt, e_dt = parse_date(raw_s), parse_date(raw_e)
         if not s_dt or not e_dt or e_dt <= s_dt:
             messagebox.showerror("Input Error", "Check date format (DD/MM/YYYY) and ensure Return > Departure")
             return
 
 
             #---CONFLICT CHECK ---
-        for i, existing_trip in enumerate(self.trips):
-            # Skip checking the trip against itself if we are currently editing it
-            if self.editing_index is not None and i == self.editing_index:
-                continue
-                
-            # Overlap Logic: StartA < EndB AND StartB < EndA
-            # < allows for adjoining trips 
-            if s_dt < existing_trip.return_date and existing_trip.departure < e_dt:
-                trip_type = "What-If" if existing_trip.is_what_if else "Confirmed"
-                messagebox.showerror(
-                    "Date Conflict", 
-                    f"This trip overlaps with an existing {trip_type} trip:\n"
-                    f"{existing_trip.departure.strftime('%d/%m/%Y')} to "
-                    f"{existing_trip.return_date.strftime('%d/%m/%Y')}"
-                )
-                return # Stop the function here
+        scenario = self.scenario_entry.get().strip()
+        # Skip checking the trip against itself if we are currently editing it,
+        # and trips of other scenarios (alternatives may overlap)
+        for _, existing_trip in self.trips.overlapping(s_dt, e_dt, exclude=self.editing_id):
+            if scenario and existing_trip.scenario and existing_trip.scenario != scenario: continue
+            trip_type = "What-If" if existing_trip.is_what_if else "Confirmed"
+            messagebox.showerror(
+                "Date Conflict", 
+                f"This trip overlaps with an existing {trip_type} trip:\n"
+                f"{existing_trip.departure.strftime('%d/%m/%Y')} to "
+                f"{existing_trip.return_date.strftime('%d/%m/%Y')}"
+            )
+            return # Stop the function here
         
-        new_trip = Trip(departure=s_dt, return_date=e_dt, is_what_if=self.what_if_var.get())
+        new_trip = Trip(departure=s_dt, return_date=e_dt, is_what_if=self.what_if_var.get() or bool(scenario),
+                        scenario=scenario)
         
-        if self.editing_index is not None:
-            self.trips[self.editing_index] = new_trip
-            self.editing_index = None
+        if self.editing_id is not None:
+            if self.db: self.db.update(self.editing_id, new_trip)
+            self.state.replace(self.trips.replace(self.editing_id, new_trip), new_trip)
+            self.editing_id = None
             self.add_btn.config(text="Add Trip")
         else:
-            self.trips.append(new_trip)
+            self.trips.add(new_trip, self.db.add(new_trip) if self.db else None)
+            self.state.add(new_trip)
 
         self.refresh_tree(); self.refresh_dashboard()
         self.dep_entry.entry.delete(0, 'end'); self.ret_entry.entry.delete(0, 'end')
+        if scenario: self.update_scenario_names()
 
     def load_hardcoded_data(self):
         """Initializes with user data."""
@@ -254,78 +344,192 @@ class BNOAdvancedTracker:
 
         for dep, ret in raw:
             s, e = datetime.strptime(dep, "%d/%m/%Y"), datetime.strptime(ret, "%d/%m/%Y")
-            self.trips.append(Trip(departure=s, return_date=e))
+            self.trips.add(Trip(departure=s, return_date=e))
+        self.state.reset(self.trips)
         self.refresh_tree()
 
     def refresh_tree(self):
-        for i in self.tree.get_children(): self.tree.delete(i)
-        for t in sorted(self.trips, key=lambda x: x.departure):
-            self.tree.insert("", "end", values=(
-                t.departure.strftime("%d/%m/%Y"), 
-                t.return_date.strftime("%d/%m/%Y"),
-                t.daysAbsent,
-                "WHAT-IF" if t.is_what_if else "CONFIRMED"
-            ), tags=('hypothetical',) if t.is_what_if else ())
+        """
+        Brings the Treeview in line with self.trips, touching only rows that changed,
+        so scroll position and selection survive. Rows are keyed by TripStore ID.
+        Histories longer than TREE_WINDOW render only a window of rows (see scroll_tree).
+        """
+        with instrumentation.span("refresh_tree"):
+            n = len(self.trips)
+            self.tree_start = max(0, min(self.tree_start, n - self.TREE_WINDOW))
+            wanted = self.trips.items(self.tree_start, self.tree_start + self.TREE_WINDOW)
+            wanted_ids = {str(trip_id) for trip_id, _ in wanted}
+
+            shown = self.tree_rows
+            gone = [iid for iid in shown if iid not in wanted_ids]
+            if gone:
+                self.tree.delete(*gone)
+                for iid in gone: del shown[iid]
+            for trip_id, t in wanted:
+                iid = str(trip_id)
+                old = shown.get(iid)
+                if old is None or old == t: continue
+                values, tags = trip_row(t)
+                self.tree.item(iid, values=values, tags=tags)
+                shown[iid] = t
+                if old.departure != t.departure:
+                    self.tree.detach(iid) # re-placed below
+
+            # Untouched rows are already in departure order, so one merge pass places the rest
+            current, j = self.tree.get_children(), 0
+            for index, (trip_id, t) in enumerate(wanted):
+                iid = str(trip_id)
+                if j < len(current) and current[j] == iid:
+                    j += 1
+                elif iid in shown:
+                    self.tree.move(iid, "", index)
+                else:
+                    values, tags = trip_row(t)
+                    self.tree.insert("", index, iid=iid, values=values, tags=tags)
+                    shown[iid] = t
+
+    def windowed(self):
+        return len(self.trips) > self.TREE_WINDOW
+
+    def show_tree_at(self, index):
+        """Windowed mode: re-centres the rendered rows so history position `index` is at the top."""
+        self.tree_shift_pending = False
+        self.tree_start = max(0, index - self.TREE_WINDOW // 4)
+        self.refresh_tree()
+        rows = len(self.tree_rows)
+        if rows:
+            self.tree.yview_moveto((index - self.tree_start) / rows)
+
+    def scroll_tree(self, *args):
+        """Scrollbar command. Positions are fractions of the whole history."""
+        if not self.windowed() or args[0] != "moveto":
+            self.tree.yview(*args) # unit/page steps scroll within the window; on_tree_scroll shifts it
+            return
+        n = len(self.trips)
+        self.show_tree_at(min(n - 1, max(0, int(float(args[1]) * n))))
+
+    def on_tree_scroll(self, first, last):
+        """Treeview yscrollcommand: maps the window onto the whole history and slides it at the edges."""
+        first, last = float(first), float(last)
+        if not self.windowed():
+            self.tree_scroll.set(first, last)
+            return
+        n, rows = len(self.trips), max(1, len(self.tree_rows))
+        self.tree_scroll.set((self.tree_start + first * rows) / n, (self.tree_start + last * rows) / n)
+        at_top = first <= 0 and self.tree_start > 0
+        at_bottom = last >= 1 and self.tree_start + rows < n
+        if (at_top or at_bottom) and not self.tree_shift_pending:
+            self.tree_shift_pending = True
+            self.root.after_idle(self.show_tree_at, self.tree_start + int(first * rows))
 
     def delete_trip(self):
         sel = self.tree.selection()
         if sel:
-            item = self.tree.item(sel[0])['values']
-            self.trips = [t for t in self.trips if t.departure.strftime("%d/%m/%Y") != item[0]]
+            if self.db: self.db.remove(*map(int, sel))
+            for iid in sel:
+                self.state.remove(self.trips.remove(int(iid)))
+            if self.editing_id is not None and self.editing_id not in self.trips:
+                self.editing_id = None
+                self.add_btn.config(text="Add Trip")
             self.refresh_tree(); self.refresh_dashboard()
 
     def load_edit(self):
         sel = self.tree.selection()
         if not sel: return
-        item = self.tree.item(sel[0])['values']
-        for i, t in enumerate(self.trips):
-            if t.departure.strftime("%d/%m/%Y") == item[0]:
-                self.editing_index = i
-                self.dep_entry.entry.delete(0, 'end'); self.dep_entry.entry.insert(0, item[0])
-                self.ret_entry.entry.delete(0, 'end'); self.ret_entry.entry.insert(0, item[1])
-                self.what_if_var.set(t.is_what_if)
-                self.add_btn.config(text="Save Edit")
-                break
+        self.editing_id = int(sel[0])
+        t = self.trips.get(self.editing_id)
+        self.dep_entry.entry.delete(0, 'end'); self.dep_entry.entry.insert(0, t.departure.strftime("%d/%m/%Y"))
+        self.ret_entry.entry.delete(0, 'end'); self.ret_entry.entry.insert(0, t.return_date.strftime("%d/%m/%Y"))
+        self.what_if_var.set(t.is_what_if)
+        self.scenario_entry.delete(0, 'end'); self.scenario_entry.insert(0, t.scenario)
+        self.add_btn.config(text="Save Edit")
+
+    def open_database(self, db_file):
+        """Opens the trip database, migrating trips_data.json into it the first time."""
+        try:
+            with instrumentation.span("open_database"):
+                self.db = TripDatabase(db_file)
+                migrated = self.db.migrate_json("trips_data.json")
+        except Exception as e:
+            self.db = None
+            messagebox.showerror("Database Error", f"Could not open {db_file}: {e}\nFalling back to trips_data.json")
+            self.load_data()
+            return
+        with instrumentation.span("load_database"):
+            items = self.db.items()
+        self.set_trips(items)
+        if migrated:
+            messagebox.showinfo("Migrated", f"{migrated} trips copied from trips_data.json into {db_file}")
+
+    def set_trips(self, items):
+        """Replaces the whole history with (id, Trip) pairs (id None = assign one)."""
+        self.trips.clear()
+        self.editing_id = None
+        self.add_btn.config(text="Add Trip")
+        for trip_id, new_trip in items:
+            self.trips.add(new_trip, trip_id)
+        self.state.reset(self.trips)
+        self.refresh_tree()
+        self.refresh_dashboard()
+        self.update_scenario_names()
+
+    def update_scenario_names(self):
+        self.scenario_entry.config(values=sorted({t.scenario for t in self.trips if t.scenario}))
+
+    def import_trips(self, filename=None):
+        """Bulk-imports an export file: one sorted merge pass, one insert, one conflict report."""
+        filename = filename or filedialog.askopenfilename(
+            title="Import Trips", filetypes=[("Travel exports", "*.csv *.jsonl *.json"), ("All files", "*.*")])
+        if not filename: return
+        merge = messagebox.askyesno("Import Trips", "Merge overlapping or back-to-back rows into single trips?\n"
+                                                    "(No = keep the first and flag the rest)\n\n"
+                                                    "A shared return/departure day becomes an absence day when merged.")
+        try:
+            result = import_file(filename, self.trips, merge=merge)
+        except Exception as e:
+            messagebox.showerror("Import Error", f"Could not read {filename}: {e}")
+            return
 
-    def save_data(self, filename="trips_data.json"):
-        #Serialise
+        if result.accepted:
+            ids = self.db.add_many(result.accepted) if self.db else [None] * len(result.accepted)
+            for trip_id, new_trip in zip(ids, result.accepted):
+                self.trips.add(new_trip, trip_id)
+            self.state.reset(self.trips) # one rebuild instead of an update per trip
+            self.refresh_tree(); self.refresh_dashboard()
+        self.show_import_report(filename, result)
 
-        try:
-            #Trip obj to dict (datetime -> str)
-            data_to_save = []
-            for t in self.trips:
-                data_to_save.append({
-                    "departure": t.departure.isoformat(),
-                    "return_date": t.return_date.isoformat(),
-                    "is_what_if": t.is_what_if
-                })
+    def show_import_report(self, filename, result):
+        if not result.conflicts:
+            messagebox.showinfo("Import Complete", result.summary())
+            return
+        win = tb.Toplevel(self.root)
+        win.title("Import Report")
+        win.geometry("760x420")
+        tb.Label(win, text=f"{filename}\n{result.summary()}", padding=10).pack(fill="x")
+        frame = tb.Frame(win, padding=(10, 0, 10, 10))
+        frame.pack(fill="both", expand=True)
+        text = tk.Text(frame, wrap="none", font=("Consolas", 10))
+        scroll = tb.Scrollbar(frame, orient="vertical", command=text.yview)
+        text.configure(yscrollcommand=scroll.set)
+        scroll.pack(side="right", fill="y"); text.pack(side="left", fill="both", expand=True)
+        text.insert("end", "\n".join(f"line {c['line']:>6}  {c['problem']:<18} {c['detail']}" for c in result.conflicts))
+        text.config(state="disabled")
 
-            with open(filename, "w") as f:
-                json.dump(data_to_save,f , indent=4)
+    def save_data(self, filename="trips_data.json"):
+        #Serialise (the database is already up to date; this exports a JSON copy)
 
-                messagebox.showinfo("Save success:" , f"Data saved to {filename}")
+        try:
+            save_trips(self.trips, filename)
+            messagebox.showinfo("Save success:" , f"Data saved to {filename}")
 
         except Exception as e:
             messagebox.showerror("Save Error:", f"Could not save to {filename}")
 
     def load_data(self, filename="trips_data.json"):
         try:
-            with open(filename, "r") as f:
-
-                raw_data = json.load(f)
-
-            self.trips = [] # clear current list
-            for item in raw_data:
-                new_trip = Trip(
-                    departure=datetime.fromisoformat(item["departure"]),
-                    return_date=datetime.fromisoformat(item["return_date"]),
-                    is_what_if=item["is_what_if"]
-                )
-
-                self.trips.append(new_trip)
-
-            self.refresh_tree()
-            self.refresh_dashboard()
+            with instrumentation.span("load_data"):
+                loaded = load_trips(filename)
+            self.set_trips(self.db.replace_all(loaded) if self.db else [(None, t) for t in loaded])
 
             messagebox.showinfo("Loaded", "History synced")
         except FileNotFoundError:
@@ -373,6 +577,181 @@ class BNOAdvancedTracker:
         self.apply_zoom()
 
 
+    def show_scenarios(self):
+        """View: Baseline and every named scenario evaluated side by side (in worker processes)."""
+        ilr_date, bc_date = self.engine.getMilestoneDates(self.visa_entry.entry.get())
+        if not ilr_date:
+            messagebox.showerror("Input Error", "Set a valid Visa Approved date first.")
+            return
+
+        win = tb.Toplevel(self.root)
+        win.title("Scenario Comparison")
+        win.geometry("1100x420")
+        bar = tb.Frame(win, padding=10)
+        bar.pack(fill="x")
+        tb.Label(bar, text="Rank by:").pack(side="left")
+        rank_by = tb.Combobox(bar, values=list(RANKINGS), state="readonly", width=12)
+        rank_by.set("overall")
+        rank_by.pack(side="left", padx=5)
+        status = tb.Label(bar, text="Evaluating scenarios…")
+        status.pack(side="left", padx=15)
+
+        cols = ("#", "Scenario", "Trips", "ILR Max", "BC Total", "BC Final", "Budget", "Earliest ILR", "Earliest BC", "Breaches")
+        table = tb.Treeview(win, columns=cols, show='headings', height=12)
+        for col in cols:
+            table.heading(col, text=col, anchor="center")
+            table.column(col, anchor="center", width=60 if col in ("#", "Trips") else 110)
+        table.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        results = []
+
+        def day(d):
+            return d.strftime("%d/%m/%Y") if d else "never"
+
+        def show(event=None):
+            table.delete(*table.get_children())
+            for n, r in enumerate(rank(results, rank_by.get()), 1):
+                table.insert("", "end", values=(
+                    n, r.name, r.trips, r.ilr_max, r.bc_total, r.bc_final, r.max_safe,
+                    day(r.earliest_ilr), day(r.earliest_bc), ", ".join(r.breaches) or "none"))
+        rank_by.bind("<<ComboboxSelected>>", show)
+
+        # Spawned, not forked: forking a threaded Tk process can copy held locks into the workers
+        job = self.scenario_executor.submit(compare_scenarios, list(self.trips), ilr_date, bc_date, None,
+                                            self.engine.mode, mp_context=multiprocessing.get_context("spawn"))
+        def poll():
+            if not win.winfo_exists(): return
+            if not job.done():
+                win.after(self.POLL_MS * 5, poll)
+                return
+            try:
+                results.extend(job.result())
+            except Exception as e:
+                status.config(text=f"Could not evaluate scenarios: {e}")
+                return
+            status.config(text=f"{len(results) - 1} scenario(s) against the confirmed history")
+            show()
+        poll()
+
+    def show_budget_calendar(self, years=2):
+        """View: Heatmap of the longest safe trip for every departure date (months x days)."""
+        ilr_date, bc_date = self.engine.getMilestoneDates(self.visa_entry.entry.get())
+        if not ilr_date:
+            messagebox.showerror("Input Error", "Set a valid Visa Approved date first.")
+            return
+        # Named-scenario trips are alternatives; adding them together would understate every budget
+        table = TripTable.fromTrips(t for t in self.trips if not t.scenario)
+        calendar = self.engine.getBudgetCalendar(table, bc_date, days=years*365)
+
+        win = tb.Toplevel(self.root)
+        win.title("Travel Budget Calendar")
+        cell, left, top = 22, 80, 24
+        months = sorted({(d.year, d.month) for d, _, _ in calendar})
+        canvas = tk.Canvas(win, width=left + 31*cell + 10, height=top + len(months)*cell + 10, highlightthickness=0)
+        canvas.pack(padx=10, pady=10)
+        detail = tb.Label(win, text="Hover over a day to see its travel budget.", font=("Arial", 12))
+        detail.pack(pady=(0, 10))
+
+        for day in range(1, 32):
+            canvas.create_text(left + (day - 0.5)*cell, top/2, text=str(day), font=("Arial", 8))
+        rows = {m: i for i, m in enumerate(months)}
+        for (year, month), row in rows.items():
+            canvas.create_text(left - 8, top + (row + 0.5)*cell, text=f"{year}-{month:02d}", anchor="e", font=("Arial", 9))
+
+        def colour(max_safe):
+            if max_safe == 0: return "#c0392b"
+            if max_safe <= 14: return "#e67e22"
+            if max_safe <= 60: return "#f1c40f"
+            return "#27ae60"
+
+        cells = {}
+        for d, max_safe, limit in calendar:
+            row = rows[(d.year, d.month)]
+            x, y = left + (d.day - 1)*cell, top + row*cell
+            rect = canvas.create_rectangle(x + 1, y + 1, x + cell - 1, y + cell - 1, fill=colour(max_safe), outline="")
+            cells[rect] = f"Depart {d.strftime('%d/%m/%Y')}: up to {max_safe} days  ({limit})"
+
+        def on_hover(event):
+            hit = canvas.find_closest(event.x, event.y)
+            if hit and hit[0] in cells:
+                detail.config(text=cells[hit[0]])
+        canvas.bind("<Motion>", on_hover)
+
+    def show_diagnostics(self, event=None):
+        """View: Timing spans, call counters, trace file and cProfile capture for the compute pipeline."""
+        if self.diag_menu is None:
+            self.diag_menu = tk.Menu(self.menu_bar, tearoff=0)
+            self.menu_bar.insert_cascade(self.menu_bar.index("end"), label="Diagnostics", menu=self.diag_menu)
+            self.diag_menu.add_command(label="Profiling Panel", command=self.show_diagnostics, accelerator="Ctrl+Shift+D")
+
+        win = tb.Toplevel(self.root)
+        win.title("Diagnostics")
+        win.geometry("900x600")
+        bar = tb.Frame(win, padding=10)
+        bar.pack(fill="x")
+        enabled = tk.BooleanVar(value=instrumentation.enabled())
+        tracing = tk.BooleanVar(value=instrumentation.snapshot()["tracing"] is not None)
+        profiling = tk.BooleanVar(value=False)
+        text = tk.Text(win, wrap="none", font=("Consolas", 10))
+
+        def toggle_enabled():
+            instrumentation.enable(enabled.get())
+            if not enabled.get() and tracing.get():
+                tracing.set(False); instrumentation.stop_trace()
+
+        def toggle_trace():
+            if not tracing.get():
+                instrumentation.stop_trace()
+                return
+            filename = filedialog.asksaveasfilename(parent=win, title="Trace File", defaultextension=".jsonl",
+                                                    initialfile="bno_trace.jsonl")
+            if not filename:
+                tracing.set(False)
+                return
+            instrumentation.start_trace(filename)
+            enabled.set(True)
+
+        shown = {"profile": None} # captured cProfile text while it is on screen, else None
+
+        def toggle_profile():
+            if profiling.get():
+                instrumentation.start_profile()
+                return
+            shown["profile"] = instrumentation.stop_profile() or "No profiled refresh ran during the capture."
+            show_text(shown["profile"])
+
+        def show_stats():
+            shown["profile"] = None
+            cache = self.engine.cache_info()
+            show_text(instrumentation.report() +
+                      f"\n\nEngine cache ({self.engine.mode}): {cache['hits']} hits, {cache['misses']} misses, "
+                      f"{cache['size']}/{cache['maxsize']} entries")
+
+        def show_text(body):
+            text.config(state="normal")
+            text.delete("1.0", "end")
+            text.insert("end", body)
+            text.config(state="disabled")
+
+        def update():
+            if not win.winfo_exists(): return
+            if shown["profile"] is None: show_stats()
+            win.after(1000, update)
+
+        tb.Checkbutton(bar, text="Instrumentation", variable=enabled, command=toggle_enabled).pack(side="left", padx=5)
+        tb.Checkbutton(bar, text="Trace File", variable=tracing, command=toggle_trace).pack(side="left", padx=5)
+        tb.Checkbutton(bar, text="cProfile Capture", variable=profiling, command=toggle_profile).pack(side="left", padx=5)
+        tb.Button(bar, text="Reset", command=instrumentation.reset, bootstyle="secondary-outline").pack(side="right", padx=5)
+        tb.Button(bar, text="Stats", command=show_stats, bootstyle="info-outline").pack(side="right", padx=5)
+        text.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        update()
+
+    def on_close(self):
+        self.executor.shutdown(wait=False)
+        self.scenario_executor.shutdown(wait=False)
+        if self.db: self.db.close()
+        instrumentation.stop_trace()
+        self.root.destroy()
+
     def show_about(self):
         messagebox.showinfo(
             "About BNO Tracker", 
@@ -385,6 +764,7 @@ class BNOAdvancedTracker:
 
         
 if __name__ == "__main__":
+    instrumentation.configure_from_env()
     root = tb.Window(themename="superhero")
     app = BNOAdvancedTracker(root)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+Project: BNO Settlement & Citizenship Tracker
+Author: Kimi Tang
+Date: February 2026
+License: MIT
+Description: Batch compliance reports for many applicants, in parallel.
+
+    python -m batch clients/            [--visa 07/08/2024] [--workers N] [--out results.jsonl]
+    python -m batch manifest.jsonl      [--workers N] [--out results.jsonl]
+
+A directory is scanned for *.json files. Each file is either a bare trip list
+(trips_data.json format; needs --visa) or an object
+{"visa_date": "DD/MM/YYYY", "trips": [...]}.
+A manifest has one JSON object per line: {"file": "...", "visa_date": "..."}
+(relative paths are resolved against the manifest's folder). A manifest may
+also be a single JSON list of such objects.
+
+Every applicant is evaluated in a worker process (milestones, stats, budget,
+advice and earliest application dates, as `python -m cli`) and written as one
+JSON line as soon as it finishes. At most a few jobs per worker are in flight,
+so memory stays flat however long the batch is. A malformed file produces an
+{"error": ...} line and the batch carries on. Exit status is 0, or 1 if any
+applicant failed.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+
+def iter_jobs(source, default_visa=None):
+    """
+    Yields (file, visa_date) pairs lazily from a directory or a manifest.
+    A manifest line that cannot be read is yielded as a ready-made error record.
+    """
+    if os.path.isdir(source):
+        for entry in sorted(os.scandir(source), key=lambda e: e.name):
+            if entry.is_file() and entry.name.endswith(".json"):
+                yield entry.path, default_visa
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source) as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        # A JSON list manifest must be parsed whole; a JSON-lines one is streamed
+        lines = enumerate(json.load(f), 1) if first == "[" else ((n, line) for n, line in enumerate(f, 1) if line.strip())
+        for n, entry in lines:
+            try:
+                entry = json.loads(entry) if isinstance(entry, str) else entry
+                yield os.path.join(base, entry["file"]), entry.get("visa_date", default_visa)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                yield {"file": f"{source}:{n}", "error": f"Bad manifest entry: {type(e).__name__}: {e}"}
+
+_ENGINE = None # one engine per worker process, reused across jobs
+
+def evaluate_file(job):
+    """Worker: one applicant's report. Never raises; failures become an error record."""
+    global _ENGINE
+    path, visa = job
+    try:
+        from cli import evaluate
+        from logic import LogicEngine
+        from storage import trip_from_dict
+
+        if _ENGINE is None:
+            _ENGINE = LogicEngine("sweep", cache_size=0) # every applicant is a different trip set
+
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            visa = data.get("visa_date", visa)
+            data = data["trips"]
+        if not visa:
+            raise ValueError("No visa date (give --visa, a manifest visa_date, or a visa_date key)")
+        trips = [trip_from_dict(item) for item in data]
+        report, flags = evaluate(_ENGINE, trips, visa)
+        return {"file": path, "exit": flags, **report}
+    except Exception as e:
+        return {"file": path, "error": f"{type(e).__name__}: {e}"}
+
+def run_batch(jobs, out, workers=None, in_flight_per_worker=4):
+    """
+    Fans `jobs` out over a process pool and writes each result to `out` as a
+    JSON line in completion order. Returns (ok, failed) counts.
+    """
+    workers = workers or os.cpu_count() or 1
+    counts = {"ok": 0, "failed": 0}
+    jobs = iter(jobs)
+
+    def emit(result):
+        out.write(json.dumps(result) + "\n")
+        counts["failed" if "error" in result else "ok"] += 1
+
+    def submit(pool, n):
+        """Queues up to n more jobs; error records from the manifest are written straight away."""
+        futures = set()
+        while len(futures) < n:
+            job = next(jobs, None)
+            if job is None: break
+            if isinstance(job, dict): emit(job)
+            else: futures.add(pool.submit(evaluate_file, job))
+        return futures
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = submit(pool, workers * in_flight_per_worker)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                emit(future.result())
+            out.flush()
+            # Top the window back up: bounded memory however many jobs there are
+            pending |= submit(pool, len(done))
+    return counts["ok"], counts["failed"]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m batch", description="Batch BNO compliance reports (JSON Lines).")
+    parser.add_argument("source", help="directory of trip files, or a manifest (JSON lines or JSON list)")
+    parser.add_argument("--visa", help="visa date (DD/MM/YYYY) for files that do not carry their own")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--out", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        ok, failed = run_batch(iter_jobs(args.source, args.visa), out, args.workers)
+    finally:
+        if args.out:
+            out.close()
+    print(f"{ok} applicant(s) processed, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+"""
+Project: BNO Settlement & Citizenship Tracker
+Author: Kimi Tang
+Date: February 2026
+License: MIT
+Description: Benchmarks for the logic engine.
+
+    python -m benchmarks.run --sizes 10 100 1000 --out bench_report.json
+"""
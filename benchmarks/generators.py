@@ -0,0 +1,61 @@
+"""
+Seeded synthetic trip histories for benchmarking.
+Every generator takes (n, seed) and returns n Trip objects in departure order,
+so the same arguments always give the same history.
+"""
+import random
+from datetime import datetime, timedelta
+
+from logic import Trip
+
+START = datetime(1990, 1, 1)
+# A plausible lifetime of travel records; larger n packs trips more densely instead
+MAX_SPAN_DAYS = 40 * 365
+
+
+def _layout(n, seed, durations, gaps):
+    """
+    Lays out n back-to-back trips from START. When that would run past
+    MAX_SPAN_DAYS, departures are spread evenly (with jitter) over the span
+    instead, so the history stays decades long and trips start to overlap.
+    """
+    rng = random.Random(seed)
+    mean_step = (sum(durations) + sum(gaps)) / 2
+    trips, day = [], START
+    if n * mean_step <= MAX_SPAN_DAYS:
+        for _ in range(n):
+            day += timedelta(days=rng.randint(*gaps))
+            ret = day + timedelta(days=rng.randint(*durations))
+            trips.append(Trip(departure=day, return_date=ret))
+            day = ret
+        return trips
+    step = MAX_SPAN_DAYS / n
+    for i in range(n):
+        day = START + timedelta(days=int((i + rng.random()) * step))
+        trips.append(Trip(departure=day, return_date=day + timedelta(days=rng.randint(*durations))))
+    return trips
+
+def frequent_short(n, seed=0):
+    """Weekend and week-long trips a few weeks apart."""
+    return _layout(n, seed, durations=(2, 9), gaps=(7, 45))
+
+def long_gaps(n, seed=0):
+    """Occasional long trips separated by months at home."""
+    return _layout(n, seed, durations=(20, 120), gaps=(90, 400))
+
+def overlapping_what_ifs(n, seed=0):
+    """Confirmed history plus what-if trips that overlap it (as an unchecked import could)."""
+    confirmed = _layout(n - n // 4, seed, durations=(2, 30), gaps=(10, 90))
+    rng = random.Random(seed + 1)
+    what_ifs = []
+    for _ in range(n // 4):
+        base = rng.choice(confirmed)
+        dep = base.departure + timedelta(days=rng.randint(-10, 10))
+        what_ifs.append(Trip(departure=dep, return_date=dep + timedelta(days=rng.randint(2, 60)), is_what_if=True))
+    return sorted(confirmed + what_ifs, key=lambda t: t.departure)
+
+PROFILES = {
+    "frequent_short": frequent_short,
+    "long_gaps": long_gaps,
+    "overlapping_what_ifs": overlapping_what_ifs,
+}
@@ -0,0 +1,136 @@
+"""
+Load test for the local compliance service (python -m service).
+
+    python -m benchmarks.loadtest [--url 127.0.0.1:8765] [--spawn] [--seconds 10]
+                                  [--connections 32] [--distinct 50] [--trips 40]
+
+Each connection keeps one HTTP/1.1 connection open and posts requests back to
+back, cycling through the endpoints and --distinct seeded trip histories (so a
+low --distinct exercises the cache and coalescing, a high one the workers).
+Prints throughput, latency percentiles and the server's own counters.
+--spawn starts a server for the run and stops it afterwards.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+from benchmarks.generators import PROFILES
+from storage import trip_to_dict
+
+ENDPOINTS = ("stats", "budget", "advice", "milestones")
+
+
+def make_bodies(distinct, trips, seed):
+    """`distinct` request bodies over recent-looking seeded histories."""
+    bodies = []
+    for i in range(distinct):
+        history = PROFILES["frequent_short"](trips, seed + i)
+        # Shift the synthetic history so it ends just before the visa milestones
+        shift = history[0].departure.replace(year=2020) - history[0].departure
+        shifted = [{**trip_to_dict(t), "departure": (t.departure + shift).isoformat(),
+                    "return_date": (t.return_date + shift).isoformat()} for t in history]
+        visa = (history[0].departure + shift - timedelta(days=30)).strftime("%d/%m/%Y")
+        bodies.append(json.dumps({"visa_date": visa, "trips": shifted}).encode())
+    return bodies
+
+async def request(reader, writer, host, path, body):
+    writer.write((f"POST /{path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode() + body)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = next(int(line.split(b":", 1)[1]) for line in head.split(b"\r\n")
+                  if line.lower().startswith(b"content-length:"))
+    await reader.readexactly(length)
+    return status
+
+async def connection(host, port, bodies, offset, deadline, latencies, failures):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            # Every (endpoint, history) pair comes up once per len(ENDPOINTS) passes
+            path, body = ENDPOINTS[(i + i // len(bodies)) % len(ENDPOINTS)], bodies[i % len(bodies)]
+            start = time.perf_counter()
+            status = await request(reader, writer, host, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                failures.append(status)
+            i += 1
+    finally:
+        writer.close()
+
+async def health(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET /health HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    data = await reader.read()
+    writer.close()
+    return json.loads(data.split(b"\r\n\r\n", 1)[1])
+
+async def run(host, port, seconds, connections, bodies):
+    latencies, failures = [], []
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    stride = max(1, len(bodies) // connections) # connections start on different histories
+    await asyncio.gather(*(connection(host, port, bodies, n * stride, deadline, latencies, failures)
+                           for n in range(connections)))
+    elapsed = time.perf_counter() - start
+    return latencies, failures, elapsed, await health(host, port)
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+def wait_for_server(host, port, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            return asyncio.run(health(host, port))
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"No service on {host}:{port}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="127.0.0.1:8765", help="host:port of the service")
+    parser.add_argument("--spawn", action="store_true", help="start `python -m service` for the run")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for --spawn")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--distinct", type=int, default=50, help="different trip histories to cycle through")
+    parser.add_argument("--trips", type=int, default=40, help="trips per history")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    host, _, port = args.url.rpartition(":")
+    port = int(port)
+
+    server = None
+    if args.spawn:
+        cmd = [sys.executable, "-m", "service", "--host", host, "--port", str(port)]
+        if args.workers: cmd += ["--workers", str(args.workers)]
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        server = subprocess.Popen(cmd, cwd=root)
+    try:
+        wait_for_server(host, port)
+        bodies = make_bodies(args.distinct, args.trips, args.seed)
+        latencies, failures, elapsed, counters = asyncio.run(
+            run(host, port, args.seconds, args.connections, bodies))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    ms = lambda p: percentile(latencies, p) * 1000
+    print(f"{len(latencies)} requests in {elapsed:.1f}s over {args.connections} connections: "
+          f"{len(latencies) / elapsed:.0f} req/s, {len(failures)} non-200")
+    print(f"latency ms  p50 {ms(50):.2f}  p95 {ms(95):.2f}  p99 {ms(99):.2f}  max {latencies[-1] * 1000:.2f}")
+    print(f"server: {json.dumps(counters)}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
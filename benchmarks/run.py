@@ -0,0 +1,132 @@
+"""
+Times every LogicEngine entry point and JSON load/save on synthetic histories.
+
+    python -m benchmarks.run [--sizes N ...] [--engines MODE ...] [--out report.json]
+
+For each profile, size, engine and operation the report records the best
+wall time over --repeat runs, the peak traced memory of one extra run, and
+whether the result equals the first engine's. Exits with status 1 if any
+two non-reference engines disagree, so it can gate a release.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from importlib.util import find_spec
+
+from logic import LogicEngine
+from storage import load_trips, save_trips
+from benchmarks.generators import PROFILES
+
+DEFAULT_SIZES = [10, 100, 1000, 10_000, 100_000]
+
+
+def measure(fn, repeat):
+    """(result, best seconds, peak bytes) for fn()."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, best, peak
+
+def engine_ops(engine, trips, bc_eligible, today):
+    """The engine entry points the dashboard drives, as zero-argument callables."""
+    def advice():
+        all_max, all_bc, _ = engine.getStats(trips, bc_eligible)
+        return engine.get_troubleshooting_advice(all_max, all_bc, bc_eligible, trips)
+    return {
+        "getStats": lambda: engine.getStats(trips, bc_eligible),
+        "run_sim": lambda: engine.run_sim(trips, bc_eligible, today),
+        "get_troubleshooting_advice": advice,
+    }
+
+def json_ops(trips):
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    save_trips(trips, path) # so load has something to read even when save is timed first
+    return path, {
+        "save_json": lambda: save_trips(trips, path),
+        "load_json": lambda: len(load_trips(path)),
+    }
+
+def run(sizes, engines, profiles, repeat, reference_limit, seed, log=print):
+    rows = []
+    engines = sorted(engines, key=lambda mode: mode == "reference") # results are compared to the first engine
+    for profile in profiles:
+        for size in sizes:
+            trips = PROFILES[profile](size, seed)
+            last = max(t.return_date for t in trips)
+            bc_eligible, today = last + timedelta(days=180), last + timedelta(days=1)
+
+            baseline = {}
+            for mode in engines:
+                # The O(n^2) reference engine (and its 450x run_sim) only at small sizes
+                limits = {"run_sim": reference_limit // 10} if mode == "reference" else {}
+                if mode == "reference" and size > reference_limit:
+                    continue
+                engine = LogicEngine(mode, cache_size=0) # measure the engine, not the cache
+                for op, fn in engine_ops(engine, trips, bc_eligible, today).items():
+                    if size > limits.get(op, size):
+                        continue
+                    result, seconds, peak = measure(fn, repeat)
+                    match = baseline.setdefault(op, result) == result
+                    rows.append({"profile": profile, "size": size, "engine": engine.mode, "op": op,
+                                 "seconds": seconds, "peak_kib": peak // 1024, "match": match})
+                    log(f"{profile:>22} {size:>7} {engine.mode:>9} {op:<28} {seconds*1000:10.2f} ms "
+                        f"{peak // 1024:>9} KiB {'' if match else 'MISMATCH'}")
+
+            path, ops = json_ops(trips)
+            try:
+                for op, fn in ops.items():
+                    _, seconds, peak = measure(fn, repeat)
+                    rows.append({"profile": profile, "size": size, "engine": "-", "op": op,
+                                 "seconds": seconds, "peak_kib": peak // 1024, "match": True})
+                    log(f"{profile:>22} {size:>7} {'-':>9} {op:<28} {seconds*1000:10.2f} ms {peak // 1024:>9} KiB")
+            finally:
+                os.remove(path)
+    return rows
+
+def main(argv=None):
+    default_engines = ["sweep"] + (["numpy"] if find_spec("numpy") else []) + ["reference"]
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--engines", nargs="+", default=default_engines, choices=["sweep", "numpy", "reference"])
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reference-limit", type=int, default=1000,
+                        help="largest size the O(n^2) reference engine is run on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_report.json")
+    args = parser.parse_args(argv)
+
+    rows = run(args.sizes, args.engines, args.profiles, args.repeat, args.reference_limit, args.seed)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": find_spec("numpy") is not None,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": rows,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Report written to {args.out}")
+
+    # The reference engine only scans windows that start on a departure, so it may read lower
+    mismatches = [r for r in rows if not r["match"] and r["engine"] != "reference"]
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Project: BNO Settlement & Citizenship Tracker
+Author: Kimi Tang
+Date: February 2026
+License: MIT
+Description: Headless command line for scripted compliance checks.
+
+    python -m cli stats      trips_data.json --visa 07/08/2024
+    python -m cli budget     trips_data.json --visa 07/08/2024 [--today 01/03/2026]
+    python -m cli advice     trips_data.json --visa 07/08/2024
+    python -m cli check-file trips_data.json
+
+Prints JSON on stdout. Never imports Tk, and only imports the logic engine
+once the arguments are parsed. The exit status is 0 when everything passes,
+2 for usage errors, 3 for unreadable or invalid input, and otherwise the OR
+of one bit per breached rule:
+    4 = ILR 180-day rolling limit, 8 = BC 450-day total,
+    16 = BC 90-day final year,     32 = BC presence rule
+"""
+import argparse
+import sys
+
+EXIT_OK = 0
+EXIT_INPUT = 3
+EXIT_ILR = 4
+EXIT_BC_TOTAL = 8
+EXIT_BC_FINAL = 16
+EXIT_BC_PRESENCE = 32
+
+
+def _day(d):
+    return d.strftime("%Y-%m-%d") if d else None
+
+def _stats(max_r, total_bc, final_bc):
+    return {"rolling_max": max_r, "bc_total": total_bc, "bc_final": final_bc}
+
+def _plan(plan):
+    return {
+        "milestone": _day(plan.milestone),
+        "earliest": _day(plan.earliest),
+        "rules": [{"rule": r.rule, "value": r.value, "limit": r.limit, "earliest": _day(r.earliest)}
+                  for r in plan.rules],
+    }
+
+# Report keys per command; evaluate() only computes the sections it is asked for
+SECTIONS = {
+    "stats": ("ilr_eligible", "bc_eligible", "trips", "confirmed", "all", "breaches"),
+    "budget": ("budget", "breaches"),
+    "advice": ("advice", "earliest_application", "scenarios", "breaches"),
+}
+
+def evaluate(engine, trips, visa_str, today=None, sections=None):
+    """
+    Full compliance report for one trip history, as a JSON-ready dict, plus
+    the breach bits for the exit status. Raises ValueError on a bad visa date.
+    `sections` limits the work to some of SECTIONS (default: all of them).
+    Named-scenario trips are only reported under "scenarios" and never set a bit.
+    Shared with the batch processor and the HTTP service.
+    """
+    from datetime import timedelta
+    from logic import BC_FINAL_LIMIT, BC_TOTAL_LIMIT, ILR_LIMIT, TripTable
+
+    ilr_date, bc_date = engine.getMilestoneDates(visa_str)
+    if not ilr_date:
+        raise ValueError(f"Invalid visa date {visa_str!r} (expected DD/MM/YYYY)")
+    sections = SECTIONS if sections is None else sections
+
+    table = TripTable.fromTrips([t for t in trips if not t.scenario])
+    all_max, all_bc, all_final = engine.getStats(table, bc_date)
+
+    flags = 0
+    if all_max > ILR_LIMIT: flags |= EXIT_ILR
+    if all_bc > BC_TOTAL_LIMIT: flags |= EXIT_BC_TOTAL
+    if all_final > BC_FINAL_LIMIT: flags |= EXIT_BC_FINAL
+    if table.tripCovering(bc_date - timedelta(days=5*365)): flags |= EXIT_BC_PRESENCE
+
+    report = {
+        "visa_date": visa_str,
+        "ilr_eligible": _day(ilr_date),
+        "bc_eligible": _day(bc_date),
+        "trips": len(table),
+    }
+    if "stats" in sections:
+        confirmed = TripTable.fromTrips([t for t in trips if not t.is_what_if and not t.scenario])
+        report["confirmed"] = _stats(*engine.getStats(confirmed, bc_date))
+        report["all"] = _stats(all_max, all_bc, all_final)
+    if "budget" in sections:
+        max_safe, limit = engine.run_sim(table, bc_date, today)
+        report["budget"] = {"max_safe": max_safe, "limit_reason": limit}
+    if "advice" in sections:
+        report["advice"] = engine.get_troubleshooting_advice(all_max, all_bc, bc_date, table)
+        report["earliest_application"] = {
+            "ILR": _plan(engine.getEarliestApplication(table, ilr_date, "ILR")),
+            "BC": _plan(engine.getEarliestApplication(table, bc_date, "BC")),
+        }
+        if any(t.scenario for t in trips):
+            from scenarios import compare_scenarios
+            report["scenarios"] = [
+                {"name": r.name, "trips": r.trips, **_stats(r.ilr_max, r.bc_total, r.bc_final),
+                 "max_safe": r.max_safe, "earliest_ilr": _day(r.earliest_ilr), "earliest_bc": _day(r.earliest_bc),
+                 "breaches": list(r.breaches)}
+                for r in compare_scenarios(trips, ilr_date, bc_date, today, engine.mode, workers=1)]
+    report["breaches"] = [name for bit, name in ((EXIT_ILR, "ILR_ROLLING"), (EXIT_BC_TOTAL, "BC_TOTAL"),
+                                                 (EXIT_BC_FINAL, "BC_FINAL"), (EXIT_BC_PRESENCE, "BC_PRESENCE"))
+                          if flags & bit]
+    return report, flags
+
+def check_trips(trips):
+    """Structural problems in a history: non-positive trips and overlaps (sorted sweep)."""
+    problems = []
+    latest = None # trip with the latest return so far
+    for t in sorted(trips, key=lambda t: (t.departure, t.return_date)):
+        if t.return_date <= t.departure:
+            problems.append({"problem": "return_not_after_departure",
+                             "departure": _day(t.departure), "return_date": _day(t.return_date)})
+            continue
+        if latest and t.departure < latest.return_date:
+            problems.append({"problem": "overlap",
+                             "first": [_day(latest.departure), _day(latest.return_date)],
+                             "second": [_day(t.departure), _day(t.return_date)]})
+        if latest is None or t.return_date > latest.return_date:
+            latest = t
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cli", description="BNO residency compliance checks (headless).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, text in (("stats", "rolling-window and BC totals"),
+                       ("budget", "longest safe trip leaving tomorrow"),
+                       ("advice", "troubleshooting advice and earliest application dates")):
+        p = sub.add_parser(name, help=text)
+        p.add_argument("file", nargs="?", default="trips_data.json")
+        p.add_argument("--visa", required=True, help="visa approval date, DD/MM/YYYY")
+        p.add_argument("--today", help="evaluate as if today were DD/MM/YYYY")
+        p.add_argument("--engine", default="sweep", choices=["auto", "sweep", "numpy", "reference"],
+                       help="'sweep' (default) avoids importing NumPy for a faster start")
+    p = sub.add_parser("check-file", help="validate a trips_data.json file")
+    p.add_argument("file", nargs="?", default="trips_data.json")
+    args = parser.parse_args(argv)
+
+    import json
+    import instrumentation
+    from storage import load_trips
+
+    instrumentation.configure_from_env()
+
+    try:
+        trips = load_trips(args.file)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(json.dumps({"file": args.file, "error": f"{type(e).__name__}: {e}"}))
+        return EXIT_INPUT
+
+    if args.command == "check-file":
+        problems = check_trips(trips)
+        print(json.dumps({"file": args.file, "trips": len(trips), "problems": problems}, indent=2))
+        return EXIT_INPUT if problems else EXIT_OK
+
+    from datetime import datetime
+    from logic import LogicEngine
+
+    try:
+        today = datetime.strptime(args.today, "%d/%m/%Y") if args.today else None
+        report, flags = evaluate(LogicEngine(args.engine), trips, args.visa, today, {args.command})
+    except ValueError as e:
+        print(json.dumps({"file": args.file, "error": str(e)}))
+        return EXIT_INPUT
+
+    keys = SECTIONS[args.command]
+    print(json.dumps({"file": args.file, **{k: report[k] for k in keys if k in report}}, indent=2))
+    return flags
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Project: BNO Settlement & Citizenship Tracker
+Author: Kimi Tang
+Date: February 2026
+License: MIT
+Description: Streaming import of travel-history exports (CSV or JSON lines).
+
+Rows are read lazily in chunks, parsed, sorted once and swept in departure
+order, so n rows cost O(n log n) in total instead of one overlap scan per row.
+Every problem ends up in a single conflict report.
+
+CSV files need a header row. Recognised columns (case-insensitive):
+    departure:   departure, dep, depart, start, from, out
+    return date: return_date, return, ret, end, to, back, in
+    what-if:     is_what_if, what_if, whatif, planned   (optional; yes/true/1)
+JSON lines use the trips_data.json keys, one trip object per line.
+Dates may be DD/MM/YYYY, DD/MM/YY (as typed in the app) or ISO 8601.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from itertools import islice
+
+from logic import Trip
+from store import TripStore
+
+DATE_FORMATS = ("%d/%m/%Y", "%d/%m/%y")
+CHUNK_ROWS = 5000
+
+_COLUMNS = {
+    "departure": ("departure", "dep", "depart", "start", "from", "out"),
+    "return_date": ("return_date", "return", "ret", "end", "to", "back", "in"),
+    "is_what_if": ("is_what_if", "what_if", "whatif", "planned"),
+}
+_TRUE = {"1", "true", "yes", "y", "x", "what-if", "what_if"}
+
+
+def parse_date(text):
+    """
+    The date formats accepted in the Absence Log (plus ISO for exports), as a
+    naive midnight datetime. None if unreadable, or if it carries a time of day
+    or timezone: the engines count whole days.
+    """
+    text = text.strip()
+    parts = text.split("/")
+    if len(parts) == 3 and len(parts[0]) <= 2 and len(parts[1]) <= 2 and len(parts[2]) == 4 \
+            and all(p.isdigit() for p in parts):
+        # DD/MM/YYYY without strptime (which dominates the cost of a large import), same rules
+        try: return datetime(int(parts[2]), int(parts[1]), int(parts[0]))
+        except ValueError: return None
+    for fmt in DATE_FORMATS:
+        try: return datetime.strptime(text, fmt)
+        except ValueError: continue
+    try:
+        return datetime.combine(date.fromisoformat(text), time())
+    except ValueError:
+        pass
+    try: # trips_data.json writes midnight datetimes
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    return dt if dt.tzinfo is None and dt.time() == time() else None
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    accepted: list = field(default_factory=list)   # Trips to insert, in departure order
+    conflicts: list = field(default_factory=list)  # {"line", "problem", "detail"} dicts
+    merged: int = 0                                # rows folded into a neighbouring trip
+
+    def summary(self):
+        return (f"{self.rows} rows read, {len(self.accepted)} trips imported, "
+                f"{self.merged} merged, {len(self.conflicts)} flagged")
+
+def _fmt(t):
+    return f"{t.departure.strftime('%d/%m/%Y')} to {t.return_date.strftime('%d/%m/%Y')}"
+
+def _column(header, key):
+    names = {h.strip().lower(): h for h in header if h}
+    return next((names[alias] for alias in _COLUMNS[key] if alias in names), None)
+
+def read_rows(filename):
+    """Yields (line number, departure text, return text, what-if text) lazily from CSV or JSON lines."""
+    with open(filename, newline="", encoding="utf-8-sig") as f:
+        first = f.readline()
+        f.seek(0)
+        if first.lstrip().startswith("{"):
+            for n, line in enumerate(f, 1):
+                if not line.strip(): continue
+                try:
+                    item = json.loads(line)
+                    yield n, str(item["departure"]), str(item["return_date"]), str(item.get("is_what_if", ""))
+                except (ValueError, KeyError, TypeError) as e:
+                    yield n, None, None, f"{type(e).__name__}: {e}"
+            return
+
+        reader = csv.DictReader(f)
+        dep_col, ret_col = _column(reader.fieldnames or [], "departure"), _column(reader.fieldnames or [], "return_date")
+        if not dep_col or not ret_col:
+            raise ValueError(f"No departure/return columns in header: {reader.fieldnames}")
+        wif_col = _column(reader.fieldnames, "is_what_if")
+        for row in reader:
+            yield reader.line_num, row[dep_col] or "", row[ret_col] or "", (row[wif_col] or "") if wif_col else ""
+
+def chunks(rows, size=CHUNK_ROWS):
+    """Groups a row stream into lists of at most `size` rows."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk: return
+        yield chunk
+
+def parse_rows(rows, result):
+    """Yields (line, Trip) for each valid row; bad rows go straight into result.conflicts."""
+    for chunk in chunks(rows):
+        for line, dep, ret, what_if in chunk:
+            result.rows += 1
+            if dep is None: # unreadable JSON line; the error text is in the last field
+                result.conflicts.append({"line": line, "problem": "unreadable", "detail": what_if})
+                continue
+            s_dt, e_dt = parse_date(dep), parse_date(ret)
+            if not s_dt or not e_dt or e_dt <= s_dt:
+                result.conflicts.append({"line": line, "problem": "invalid_dates", "detail": f"{dep!r} to {ret!r}"})
+                continue
+            yield line, Trip(departure=s_dt, return_date=e_dt, is_what_if=what_if.strip().lower() in _TRUE)
+
+def merge_trips(parsed, existing=(), merge=False, result=None):
+    """
+    Sorts the parsed (line, Trip) pairs once and sweeps them in departure order.
+    Overlaps between imported rows: the later row is rejected, or with merge=True
+    folded into the earlier trip (same confirmed/what-if kind only). Adjoining rows
+    (return day == next departure) are allowed and flagged, or merged likewise.
+    A merged trip covers both rows, so the shared day becomes an absence day:
+    01/01-10/01 plus 10/01-20/01 counts 18 days instead of 8 + 9 = 17.
+    Survivors that overlap a trip in `existing` (a TripStore or iterable of Trips)
+    are rejected, each found by bisect in O(log n).
+    """
+    result = result or ImportResult()
+    if not isinstance(existing, TripStore):
+        existing = TripStore(existing)
+
+    kept = [] # [line, Trip] of accepted imports, in departure order
+    latest = None # kept entry with the latest return so far
+    for line, t in sorted(parsed, key=lambda p: (p[1].departure, p[1].return_date)):
+        if latest and t.departure <= latest[1].return_date:
+            other = latest[1]
+            touching = t.departure == other.return_date
+            if merge and t.is_what_if == other.is_what_if:
+                latest[1] = Trip(departure=other.departure, return_date=max(other.return_date, t.return_date),
+                                 is_what_if=t.is_what_if)
+                result.merged += 1
+                continue
+            if not touching:
+                problem = "duplicate" if t == other else "overlaps_import"
+                result.conflicts.append({"line": line, "problem": problem, "detail": f"{_fmt(t)} overlaps line {latest[0]}: {_fmt(other)}"})
+                continue
+            result.conflicts.append({"line": line, "problem": "adjoining", "detail": f"{_fmt(t)} starts the day line {latest[0]} returns (kept)"})
+        entry = [line, t]
+        kept.append(entry)
+        if latest is None or t.return_date > latest[1].return_date:
+            latest = entry
+
+    for line, t in kept:
+        clash = existing.overlapping(t.departure, t.return_date)
+        if clash:
+            other = clash[0][1]
+            problem = "duplicate" if t == other else "overlaps_existing"
+            result.conflicts.append({"line": line, "problem": problem, "detail": f"{_fmt(t)} overlaps existing trip {_fmt(other)}"})
+        else:
+            result.accepted.append(t)
+    result.conflicts.sort(key=lambda c: c["line"])
+    return result
+
+def import_file(filename, existing=(), merge=False):
+    """Reads, validates and merges one export file. Raises OSError/ValueError if it cannot be read at all."""
+    result = ImportResult()
+    return merge_trips(parse_rows(read_rows(filename), result), existing, merge, result)
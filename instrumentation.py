@@ -0,0 +1,201 @@
+"""
+Project: BNO Settlement & Citizenship Tracker
+Author: Kimi Tang
+Date: February 2026
+License: MIT
+Description: Lightweight timing spans, call counters, trace file and cProfile capture.
+
+Everything is off by default. While disabled, span() hands back one shared
+no-op context manager and count() returns at once, so the hot paths only pay
+a global lookup. Turn it on from the hidden Diagnostics panel (Ctrl+Shift+D)
+or with the environment variables BNO_DIAGNOSTICS=1 / BNO_TRACE=<file>
+(read by the app and CLI at start-up; see configure_from_env).
+
+    with span("refresh_tree"): ...
+    count("getStats")
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+_enabled = False
+_lock = threading.Lock()
+_spans = {}        # name -> [calls, total s, max s, last s]
+_counters = {}     # name -> calls
+_last_refresh = {} # counter deltas of the most recent dashboard refresh
+_refreshes = 0
+_errors = deque(maxlen=20) # (time, where, formatted traceback)
+_trace = None      # open JSON-lines trace file, or None
+_profiler = None
+_profile_lock = threading.Lock() # one thread at a time may run under the profiler
+_NULL = nullcontext()
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+def enabled():
+    return _enabled
+
+def reset():
+    global _refreshes
+    with _lock:
+        _spans.clear(); _counters.clear(); _last_refresh.clear(); _errors.clear()
+        _refreshes = 0
+
+def count(name, n=1):
+    if not _enabled: return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            stat = _spans.get(self.name)
+            if stat is None:
+                _spans[self.name] = [1, elapsed, elapsed, elapsed]
+            else:
+                stat[0] += 1; stat[1] += elapsed; stat[3] = elapsed
+                if elapsed > stat[2]: stat[2] = elapsed
+            if _trace is not None:
+                _trace.write(json.dumps({"ts": time.time(), "span": self.name, "ms": round(elapsed * 1000, 3),
+                                         "thread": threading.current_thread().name}) + "\n")
+        return False
+
+def span(name):
+    """Times the `with` block under `name` (no-op while disabled)."""
+    return _Span(name) if _enabled else _NULL
+
+def error(where, exc):
+    """Keeps the traceback of a swallowed exception for the Diagnostics panel."""
+    text = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+    with _lock:
+        _errors.append((time.time(), where, text))
+    count(f"error:{where}")
+
+def counters():
+    """Copy of the call counters (empty while disabled); pass to end_refresh."""
+    if not _enabled: return {}
+    with _lock:
+        return dict(_counters)
+
+def end_refresh(before):
+    """Records how many calls of each kind one dashboard refresh made since `before`."""
+    global _refreshes
+    if not _enabled: return
+    with _lock:
+        _last_refresh.clear()
+        _last_refresh.update({k: v - before.get(k, 0) for k, v in _counters.items() if v != before.get(k, 0)})
+        _refreshes += 1
+
+def snapshot():
+    """Everything recorded so far, as plain data."""
+    with _lock:
+        return {
+            "enabled": _enabled,
+            "spans": {name: {"calls": c, "total_ms": t * 1000, "mean_ms": t * 1000 / c, "max_ms": m * 1000,
+                             "last_ms": last * 1000} for name, (c, t, m, last) in _spans.items()},
+            "counters": dict(_counters),
+            "refreshes": _refreshes,
+            "last_refresh": dict(_last_refresh),
+            "errors": list(_errors),
+            "tracing": _trace.name if _trace else None,
+            "profiling": _profiler is not None,
+        }
+
+def report():
+    """snapshot() as an aligned text table."""
+    snap = snapshot()
+    lines = [f"{'span':<34}{'calls':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}{'last ms':>10}"]
+    for name, s in sorted(snap["spans"].items(), key=lambda kv: -kv[1]["total_ms"]):
+        lines.append(f"{name:<34}{s['calls']:>8}{s['total_ms']:>12.1f}{s['mean_ms']:>10.2f}"
+                     f"{s['max_ms']:>10.2f}{s['last_ms']:>10.2f}")
+    lines += ["", f"{'counter':<34}{'calls':>8}{'last refresh':>14}"]
+    for name, n in sorted(snap["counters"].items()):
+        lines.append(f"{name:<34}{n:>8}{snap['last_refresh'].get(name, 0):>14}")
+    lines.append(f"\n{snap['refreshes']} dashboard refresh(es) recorded")
+    for when, where, text in snap["errors"]:
+        lines += ["", f"[{time.strftime('%H:%M:%S', time.localtime(when))}] error in {where}:", text.rstrip()]
+    return "\n".join(lines)
+
+def start_trace(filename):
+    """Appends one JSON line per finished span to `filename` (enables instrumentation)."""
+    global _trace
+    stop_trace()
+    with _lock:
+        _trace = open(filename, "a")
+    enable()
+
+def stop_trace():
+    global _trace
+    with _lock:
+        if _trace is not None:
+            _trace.close()
+            _trace = None
+
+def start_profile():
+    """Starts a cProfile capture; code inside profiled() blocks is recorded until stop_profile()."""
+    global _profiler
+    import cProfile # imported on demand; the engine imports this module
+    _profiler = cProfile.Profile()
+
+def stop_profile(limit=40, sort="cumulative"):
+    """Ends the capture and returns the top `limit` entries as text ("" if nothing ran)."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None: return ""
+    import io, pstats
+    with _profile_lock: # wait for a profiled block still running on another thread
+        out = io.StringIO()
+        try:
+            pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+        except TypeError: # no samples were collected
+            return ""
+    return out.getvalue()
+
+@contextmanager
+def profiled():
+    """
+    Runs the block under the active cProfile capture, if any. A profiler can only
+    be active in one thread at once, so a block that finds it busy runs unprofiled.
+    """
+    profiler = _profiler
+    if profiler is None or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+    try:
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+    finally:
+        _profile_lock.release()
+
+def configure_from_env():
+    """
+    Applies BNO_DIAGNOSTICS / BNO_TRACE. Called by the app and CLI entry points
+    only: worker processes import this module too, and must not all append to
+    the same trace file.
+    """
+    if os.environ.get("BNO_DIAGNOSTICS"):
+        enable()
+    if os.environ.get("BNO_TRACE"):
+        start_trace(os.environ["BNO_TRACE"])
+        atexit.register(stop_trace)
@@ -5,16 +5,40 @@ Date: February 2026
 License: MIT
 Description: A tool to automate UK residency and absence compliance checks.
 """
+import sys
+from array import array
+from importlib.util import find_spec
+from threading import Lock
+from types import SimpleNamespace
 from datetime import datetime, timedelta
 from dataclasses import dataclass
+from itertools import accumulate
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque
+from heapq import heappush, heappop
+from hashlib import blake2b
 
-@dataclass
+from instrumentation import count, span
+
+# Statutory limits and window sizes (in days)
+ROLLING_WINDOW = 365
+ILR_LIMIT = 180
+BC_TOTAL_LIMIT = 450
+BC_FINAL_LIMIT = 90
+
+# slots=True needs Python 3.10+; older interpreters fall back to a regular frozen dataclass
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(frozen=True, **_SLOTS)
 class Trip:
     """Container for absence data. Using a dataclass makes the code more 
-    readable and easier to maintain than list indexing."""
+    readable and easier to maintain than list indexing.
+    Frozen (and slotted where supported): edits replace the trip instead of mutating it.
+    A what-if trip with a `scenario` name belongs to that named plan only; see scenarios.py."""
     departure: datetime
     return_date: datetime
     is_what_if: bool = False
+    scenario: str = ""
 
     @property
     def daysAbsent(self):
@@ -25,7 +49,319 @@ class Trip:
         """
         return max(0, (self.return_date - self.departure).days - 1)
 
+@dataclass(frozen=True)
+class RuleCheck:
+    """One rule in an application-date breakdown."""
+    rule: str
+    value: int             # usage on the milestone date (presence rule: 1 if away)
+    limit: int
+    earliest: datetime     # first date from the milestone on which this rule passes, or None
+
+@dataclass(frozen=True)
+class ApplicationPlan:
+    """Earliest valid application date for one route ("ILR" or "BC")."""
+    route: str
+    milestone: datetime    # earliest date the visa timeline allows
+    earliest: datetime     # earliest date on which every rule passes at once, or None
+    rules: tuple           # RuleCheck per rule
+
+class TripTable:
+    """
+    Columnar, array-backed trip storage for the engines.
+    Departures and returns are parallel array('i') columns of day ordinals
+    (date.toordinal()) and the what-if flags are a packed bitmask, so a large
+    history costs a few bytes per trip and no datetime objects. Trip/datetime
+    objects are only created at the UI and serialisation edges.
+    """
+    __slots__ = ("departures", "returns", "what_if")
+
+    def __init__(self):
+        self.departures = array('i')
+        self.returns = array('i')
+        self.what_if = bytearray() # bit i set => row i is a what-if trip
+
+    @classmethod
+    def fromTrips(cls, trips):
+        if isinstance(trips, cls):
+            return trips
+        table = cls()
+        for t in trips:
+            table.append(t.departure.toordinal(), t.return_date.toordinal(), t.is_what_if)
+        return table
+
+    def __len__(self):
+        return len(self.departures)
+
+    def append(self, departure, return_date, is_what_if=False):
+        i = len(self.departures)
+        self.departures.append(departure)
+        self.returns.append(return_date)
+        if i % 8 == 0:
+            self.what_if.append(0)
+        if is_what_if:
+            self.what_if[i >> 3] |= 1 << (i & 7)
+
+    def isWhatIf(self, i):
+        return bool(self.what_if[i >> 3] >> (i & 7) & 1)
+
+    def trip(self, i):
+        """Row i as a Trip (datetime edge)."""
+        return Trip(departure=datetime.fromordinal(self.departures[i]),
+                    return_date=datetime.fromordinal(self.returns[i]),
+                    is_what_if=self.isWhatIf(i))
+
+    def __iter__(self):
+        return (self.trip(i) for i in range(len(self)))
+
+    def absenceIntervals(self):
+        """Sorted inclusive (first, last) absence ordinals; see absence_intervals."""
+        intervals = [(dep + 1, ret - 1) for dep, ret in zip(self.departures, self.returns) if ret - dep >= 2]
+        intervals.sort()
+        return intervals
+
+    def absentSince(self, threshold):
+        """Absence days of trips departing after day ordinal `threshold`."""
+        return sum(max(0, ret - dep - 1) for dep, ret in zip(self.departures, self.returns) if dep > threshold)
+
+    def tripCovering(self, moment):
+        """First trip with departure <= moment <= return (as Trip), or None."""
+        day = moment.toordinal()
+        midnight = moment == datetime.fromordinal(day)
+        for i, (dep, ret) in enumerate(zip(self.departures, self.returns)):
+            if dep <= day and (day < ret or (midnight and day == ret)):
+                return self.trip(i)
+        return None
+
+def absence_intervals(trips):
+    """
+    Converts trips into inclusive (first, last) day ordinals of counted absence.
+    Departure and return days are excluded, so a trip leaving on day D and
+    returning on day R contributes the days D+1 .. R-1.
+    """
+    if isinstance(trips, TripTable):
+        return trips.absenceIntervals()
+    intervals = []
+    for t in trips:
+        first, last = t.departure.toordinal() + 1, t.return_date.toordinal() - 1
+        if first <= last:
+            intervals.append((first, last))
+    intervals.sort()
+    return intervals
+
+def absence_prefix(intervals, lo, hi):
+    """
+    Day-level prefix sum of absences over [lo, hi]: prefix[i] is the number of
+    absence days in [lo, lo + i). Intervals outside the range are clipped.
+    """
+    size = hi - lo + 1
+    diff = [0] * (size + 1)
+    for first, last in intervals:
+        first, last = max(first, lo), min(last, hi)
+        if first <= last:
+            diff[first - lo] += 1
+            diff[last - lo + 1] -= 1
+
+    prefix = [0]
+    prefix.extend(accumulate(accumulate(diff[:size])))
+    return prefix
+
+def rolling_max(intervals, window=ROLLING_WINDOW):
+    """
+    THE SWEEP-LINE ALGORITHM:
+    Builds a day-level absence count with a difference array, turns it into a
+    prefix sum and reads every `window`-day sum as prefix[i + window] - prefix[i].
+    Cost is O(n log n + days) and every window is checked, not just the ones
+    starting on a departure date.
+    """
+    if not intervals:
+        return 0
+    lo = intervals[0][0]
+    hi = max(last for _, last in intervals)
+    size = hi - lo + 1
+    prefix = absence_prefix(intervals, lo, hi)
+
+    # A window never needs to start before `lo`: shifting it right only drops empty days.
+    return max(prefix[min(i + window, size)] - prefix[i] for i in range(size))
+
+def ilr_headroom(intervals, departure, window=ROLLING_WINDOW, limit=ILR_LIMIT):
+    """
+    Most absence days a new trip leaving on day ordinal `departure` can add
+    (days departure+1 .. departure+L) before some rolling window exceeds `limit`.
+    Returns -1 if the existing intervals already breach the limit.
+
+    Window [s, s+window-1] already holds W(s) days. If it contains departure+1 the
+    trip adds min(L, s+window-1-departure) days; if it starts later it adds
+    departure+L-s+1 days. Each window therefore caps L directly, and only
+    windows within `limit` days of the departure can bind.
+    """
+    if rolling_max(intervals, window) > limit:
+        return -1
+
+    lo, hi = departure - window + 2, departure + limit
+    prefix = absence_prefix(intervals, lo, hi + window - 1)
+    best = limit
+    for s in range(lo, hi + 1):
+        used = prefix[s - lo + window] - prefix[s - lo]
+        if s <= departure + 1:
+            if s + window - 1 - departure > limit - used:
+                best = min(best, limit - used)
+        else:
+            best = min(best, limit - used + s - departure - 1)
+    return best
+
+def ilr_headroom_calendar(intervals, first, count, window=ROLLING_WINDOW, limit=ILR_LIMIT):
+    """
+    ilr_headroom for every departure day in [first, first + count) in one sweep.
+    For departure D, with k = window - 1 - limit, the binding windows split into:
+      * starts in [D-k+1, D+1]: always bind, cap = limit - W(s)  (sliding max of W)
+      * starts in [D-window+2, D-k]: bind only while D <= s + k + W(s) - 1, so each
+        start is live for a contiguous run of departures  (heap with expiry)
+      * starts in [D+2, D+limit]: cap = limit - W(s) + s - D - 1  (sliding min)
+    Total cost is O(days log days) instead of O(days * window).
+    """
+    if rolling_max(intervals, window) > limit:
+        return [-1] * count
+
+    k = window - 1 - limit
+    lo, hi = first - window + 2, first + count - 1 + limit
+    prefix = absence_prefix(intervals, lo, hi + window - 1)
+    used = [prefix[i + window] - prefix[i] for i in range(hi - lo + 1)] # used[s - lo] = W(s)
+    W = lambda s: used[s - lo]
+
+    near = deque()  # starts in [D-k+1, D+1], W decreasing
+    ahead = deque() # starts in [D+2, D+limit], limit - W(s) + s increasing
+    fading = []     # heap of (limit - W(s), last departure it binds) for starts in [D-window+2, D-k]
+
+    def push_near(s):
+        while near and W(near[-1]) <= W(s): near.pop()
+        near.append(s)
+
+    def push_ahead(s):
+        g = limit - W(s) + s
+        while ahead and limit - W(ahead[-1]) + ahead[-1] >= g: ahead.pop()
+        ahead.append(s)
+
+    for s in range(first - k + 1, first + 1): push_near(s)
+    for s in range(first + 2, first + limit): push_ahead(s)
+    for s in range(lo, first - k): heappush(fading, (limit - W(s), s + k + W(s) - 1))
+
+    headroom = []
+    for D in range(first, first + count):
+        push_near(D + 1)
+        while near[0] < D - k + 1: near.popleft()
+        push_ahead(D + limit)
+        while ahead[0] < D + 2: ahead.popleft()
+        s = D - k
+        heappush(fading, (limit - W(s), s + k + W(s) - 1))
+        while fading and fading[0][1] < D: heappop(fading)
+
+        best = min(limit, limit - W(near[0]), limit - W(ahead[0]) + ahead[0] - D - 1)
+        if fading:
+            best = min(best, fading[0][0])
+        headroom.append(best)
+    return headroom
+
+def rolling_max_batch(intervals, candidates, window=ROLLING_WINDOW):
+    """Rolling max of `intervals` plus each candidate interval (or None) in turn."""
+    return [rolling_max(intervals if c is None else sorted(intervals + [c]), window) for c in candidates]
+
+def _microseconds(d):
+    return (d.toordinal() * 86400 + d.hour * 3600 + d.minute * 60 + d.second) * 1_000_000 + d.microsecond
+
+def trip_fingerprint(trips):
+    """
+    Cheap, fixed-size identity of a trip set for the result cache: a 16-byte
+    digest, so a cached entry never keeps a copy of a large history alive.
+    Results only depend on the dates, so what-if flags are ignored. Tables hash
+    their raw ordinal columns; Trip lists their (departure, return) instants in
+    order (a reordered list is a cache miss, never a wrong hit).
+    """
+    h = blake2b(digest_size=16)
+    if isinstance(trips, TripTable):
+        h.update(trips.departures.tobytes()) # equal-length columns, so the split is unambiguous
+        h.update(trips.returns.tobytes())
+        return h.digest()
+    h.update(b"list")
+    h.update(array('q', (x for t in trips for x in (_microseconds(t.departure), _microseconds(t.return_date)))).tobytes())
+    return h.digest()
+
+class ResultCache:
+    """
+    Bounded LRU cache for LogicEngine results with hit/miss counters.
+    Keys start with (method name, trip fingerprint, ...). Thread-safe, because the
+    dashboard worker and the Tk thread share one engine.
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def lookup(self, key, compute):
+        """Returns the cached value for `key`, computing and storing it on a miss."""
+        count(key[0]) # every public engine call passes through here
+        if self.maxsize <= 0:
+            with span(key[0]):
+                return compute()
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        with span(key[0]): # only misses are timed; nested spans (advice -> optimizer) are inclusive
+            value = compute() # outside the lock: nested lookups re-enter
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def invalidate(self, fingerprint=None):
+        """Drops every entry, or only those computed for one trip fingerprint."""
+        with self._lock:
+            if fingerprint is None:
+                self._data.clear()
+            else:
+                for key in [k for k in self._data if k[1] == fingerprint]:
+                    del self._data[key]
+
+    def info(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
+
+# Pure-Python backend; vectorized.py provides the same three functions on NumPy
+PURE_BACKEND = SimpleNamespace(rolling_max=rolling_max, rolling_max_batch=rolling_max_batch, ilr_headroom=ilr_headroom)
+
 class LogicEngine:
+    """
+    Compliance calculator. `mode` picks the rolling-window engine:
+    "auto" (default) uses "numpy" when NumPy is importable and "sweep" otherwise,
+    "sweep" is the pure-Python prefix-sum engine, "numpy" its vectorized twin,
+    and "reference" is the original pairwise scan kept for cross-checking results.
+    """
+    MODES = ("auto", "sweep", "numpy", "reference")
+
+    def __init__(self, mode="auto", cache_size=256):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown engine mode: {mode!r} (expected one of {self.MODES})")
+        if mode == "auto":
+            mode = "numpy" if find_spec("numpy") is not None else "sweep"
+        self.mode = mode
+        self.backend = PURE_BACKEND
+        if mode == "numpy":
+            import vectorized # deferred so importing logic never pays for NumPy
+            self.backend = vectorized
+        self.cache = ResultCache(cache_size) # cache_size=0 disables memoization
+
+    def invalidate(self, trips=None):
+        """Invalidation hook: forget cached results (for one trip set, or all)."""
+        self.cache.invalidate(None if trips is None else trip_fingerprint(trips))
+
+    def cache_info(self):
+        return self.cache.info()
+
     @staticmethod
     def getMilestoneDates(visa_date_str):
         """Calculates key milestones based on visa grant date."""
@@ -41,7 +377,63 @@ class LogicEngine:
 
     def getStats(self, trips, bc_eligible):
         """
-        THE ROLLING WINDOW ALGORITHM:
+        Returns (rolling 365-day max, BC 5-year total, BC final-year total).
+        The rolling max is the true maximum over every 365-day window.
+        """
+        return self.cache.lookup(("getStats", trip_fingerprint(trips), bc_eligible),
+                                 lambda: self._getStats(trips, bc_eligible))
+
+    def _getStats(self, trips, bc_eligible):
+        if self.mode == "reference":
+            return self.getStatsReference(list(trips), bc_eligible)
+
+        trips = TripTable.fromTrips(trips)
+        max_r = self.backend.rolling_max(absence_intervals(trips))
+        total_bc, final_bc = self.getBCTotals(trips, bc_eligible)
+        return max_r, total_bc, final_bc
+
+    def getStatsBatch(self, trips, candidates, bc_eligible):
+        """
+        getStats(trips + [candidate], bc_eligible) for every candidate trip,
+        evaluated together (one 2-D pass on the NumPy backend).
+        """
+        if self.mode == "reference":
+            return [self.getStats(list(trips) + [c], bc_eligible) for c in candidates]
+
+        trips = TripTable.fromTrips(trips)
+        candidates = TripTable.fromTrips(candidates)
+        spans = [(dep + 1, ret - 1) if ret - dep >= 2 else None
+                 for dep, ret in zip(candidates.departures, candidates.returns)]
+        maxima = self.backend.rolling_max_batch(absence_intervals(trips), spans)
+
+        bc_5yr_start = (bc_eligible - timedelta(days=5*365.25)).toordinal()
+        bc_final_start = (bc_eligible - timedelta(days=365)).toordinal()
+        total_bc, final_bc = self.getBCTotals(trips, bc_eligible)
+        results = []
+        for max_r, dep, ret in zip(maxima, candidates.departures, candidates.returns):
+            days = max(0, ret - dep - 1)
+            results.append((max_r,
+                            total_bc + (days if dep > bc_5yr_start else 0),
+                            final_bc + (days if dep > bc_final_start else 0)))
+        return results
+
+    @staticmethod
+    def getBCTotals(trips, bc_eligible):
+        """British Citizenship (BC) fixed look-back windows: (5-year total, final-year total)."""
+        bc_5yr_start = bc_eligible - timedelta(days=5*365.25)
+        bc_final_start = bc_eligible - timedelta(days=365)
+
+        if isinstance(trips, TripTable):
+            # Table rows are whole days: departure > start  <=>  departure day > start day
+            return trips.absentSince(bc_5yr_start.toordinal()), trips.absentSince(bc_final_start.toordinal())
+
+        total_bc = sum(t.daysAbsent for t in trips if t.departure > bc_5yr_start)
+        final_bc = sum(t.daysAbsent for t in trips if t.departure > bc_final_start)
+        return total_bc, final_bc
+
+    def getStatsReference(self, trips, bc_eligible):
+        """
+        THE ROLLING WINDOW ALGORITHM (reference, O(n^2)):
         Instead of checking calendar years, we check every 365-day period 
         starting from the departure of every trip to find the highest density of absences.
         """
@@ -58,40 +450,214 @@ class LogicEngine:
             )
             max_r = max(max_r, usage)
 
-        # British Citizenship (BC) fixed look-back windows
-        bc_5yr_start = bc_eligible - timedelta(days=5*365.25)
-        bc_final_start = bc_eligible - timedelta(days=365)
+        total_bc, final_bc = self.getBCTotals(trips, bc_eligible)
+        return max_r, total_bc, final_bc
 
-        total_bc = sum(t.daysAbsent for t in trips if t.departure > bc_5yr_start)
-        final_bc = sum(t.daysAbsent for t in trips if t.departure > bc_final_start)
+    def getEarliestApplication(self, trips, milestone, route="BC", horizon_days=None):
+        """
+        APPLICATION DATE OPTIMIZER:
+        Scans candidate dates A = milestone, milestone + 1 day, ... and returns the
+        first one on which every rule of the route passes at once, plus when each
+        rule passes on its own. Candidates share one sweep: the 5-year and
+        final-year totals come from a prefix sum over departure days, the
+        presence rule from a day-level "away" mask, and the ILR limit (every
+        365-day window inside the 5 years before A) from a sliding-window max.
+        Only trips departing on or before A count towards A's look-back windows.
+        """
+        return self.cache.lookup(("getEarliestApplication", trip_fingerprint(trips), milestone, route, horizon_days),
+                                 lambda: self._getEarliestApplication(trips, milestone, route, horizon_days))
 
-        return max_r, total_bc, final_bc
+    def _getEarliestApplication(self, trips, milestone, route, horizon_days):
+        if route not in ("ILR", "BC"):
+            raise ValueError(f"Unknown route: {route!r} (expected 'ILR' or 'BC')")
+        table = TripTable.fromTrips(trips)
+        a0 = milestone.toordinal()
+        if horizon_days is None:
+            # Once the last trip is over 5 years old every rule passes
+            horizon_days = max(0, max(table.returns, default=a0) + 5*366 - a0) + 1
+
+        period0 = (milestone - timedelta(days=5*365.25)).toordinal() # windows cover days after this
+        final0 = (milestone - timedelta(days=365)).toordinal()
+        presence0 = milestone - timedelta(days=5*365)
+        p0 = presence0.toordinal()
+        end = a0 + horizon_days
+
+        # P(z): absence days of trips departing on or before day z
+        lo = min(min(table.departures, default=period0), period0)
+        by_dep = [0] * (end - lo + 2)
+        away = [0] * (horizon_days + 1)
+        # Away on the presence day: departure <= p <= return, so a return day only counts at midnight
+        last_away = 0 if presence0 == datetime.fromordinal(p0) else 1
+        for dep, ret in zip(table.departures, table.returns):
+            if dep <= end:
+                by_dep[dep - lo + 1] += max(0, ret - dep - 1)
+            first, last = max(dep, p0), min(ret - last_away, p0 + horizon_days - 1)
+            if first <= last:
+                away[first - p0] += 1
+                away[last - p0 + 1] -= 1
+        P = list(accumulate(by_dep))
+        dep_sum = lambda z: P[z - lo + 1]
+        away = list(accumulate(away))
+
+        # W(s) for every window start the scan can reach
+        s_lo = period0 + 1
+        prefix = absence_prefix(absence_intervals(table), s_lo, end)
+        W = lambda s: prefix[s - s_lo + ROLLING_WINDOW] - prefix[s - s_lo]
+        windows = deque() # starts of windows inside the current period, W decreasing
+        next_start = s_lo
+
+        names = ["ILR 180-Day Rolling Limit"]
+        limits = [ILR_LIMIT]
+        if route == "BC":
+            names += ["BC 450-Day 5-Year Limit", "BC 90-Day Final Year Limit", "BC 5-Year Presence Rule"]
+            limits += [BC_TOTAL_LIMIT, BC_FINAL_LIMIT, 0]
+        values, earliest = None, [None] * len(names)
+        combined = None
+
+        for k in range(horizon_days):
+            a = a0 + k
+            # Windows [s, s+364] that fit in (period0+k, a): slide both ends by one day
+            while next_start <= a - ROLLING_WINDOW:
+                while windows and W(windows[-1]) <= W(next_start): windows.pop()
+                windows.append(next_start)
+                next_start += 1
+            while windows and windows[0] <= period0 + k: windows.popleft()
+
+            usage = [W(windows[0]) if windows else 0]
+            if route == "BC":
+                usage += [dep_sum(a) - dep_sum(period0 + k), dep_sum(a) - dep_sum(final0 + k), 1 if away[k] else 0]
+            if values is None:
+                values = usage
+
+            passed = [u <= limit for u, limit in zip(usage, limits)]
+            for i, ok in enumerate(passed):
+                if ok and earliest[i] is None:
+                    earliest[i] = milestone + timedelta(days=k)
+            if all(passed):
+                combined = milestone + timedelta(days=k)
+                break
+
+        values = values or [0] * len(names)
+        rules = tuple(RuleCheck(name, value, limit, first)
+                      for name, value, limit, first in zip(names, values, limits, earliest))
+        return ApplicationPlan(route, milestone, combined, rules)
 
     def get_troubleshooting_advice(self, all_max, all_bc, bc_eligible, trips):
         """The 'Expert System' logic: identifies breaches and suggests fixes."""
+        return self.cache.lookup(("advice", trip_fingerprint(trips), all_max, all_bc, bc_eligible),
+                                 lambda: self._get_troubleshooting_advice(all_max, all_bc, bc_eligible, trips))
+
+    def _get_troubleshooting_advice(self, all_max, all_bc, bc_eligible, trips):
         solutions = []
         if all_max > 180:
             solutions.append("ILR BREACH: Rolling window exceeds 180 days.\nSOLUTION: Reduce 'What-If' duration or check for work-related exemptions.")
         
-        if all_bc > 450:
-            solutions.append(f"BC TOTAL BREACH: {all_bc}/450 days.\nSOLUTION: Delay app until old trips fall out of the 5-year window.")
-
         # BC Presence Rule: You must be physically in the UK exactly 5 years before the app date
         presence_date = bc_eligible - timedelta(days=5*365)
-        conflict = next((t for t in trips if t.departure <= presence_date <= t.return_date), None)
+        if isinstance(trips, TripTable):
+            conflict = trips.tripCovering(presence_date)
+        else:
+            conflict = next((t for t in trips if t.departure <= presence_date <= t.return_date), None)
+
+        # Only run the optimizer when there is something to fix
+        plan = self.getEarliestApplication(trips, bc_eligible, "BC") if all_bc > 450 or conflict else None
+
+        if all_bc > 450:
+            # getStats counts every trip after the 5-year start; on an actual application
+            # date only trips departing by then count, as in the optimizer
+            by_milestone = plan.rules[1].value
+            if by_milestone <= BC_TOTAL_LIMIT:
+                fix = (f"Only {by_milestone}/450 days fall before {bc_eligible.strftime('%d/%m/%Y')}; the rest are trips "
+                       f"planned after it. Apply before they start, or shorten them.")
+            elif plan.earliest:
+                fix = f"Delay app until {plan.earliest.strftime('%d/%m/%Y')} (earliest date meeting every BC rule)."
+            else:
+                fix = "Delay app until old trips fall out of the 5-year window."
+            solutions.append(f"BC TOTAL BREACH: {all_bc}/450 days.\nSOLUTION: {fix}")
         
         if conflict:
-            safe_app = (conflict.return_date + timedelta(days=1)) + timedelta(days=5*365)
+            # Earliest date the presence day no longer lands on any trip
+            safe_app = plan.rules[-1].earliest or (conflict.return_date + timedelta(days=1)) + timedelta(days=5*365)
             solutions.append(f"BC PRESENCE FAIL: Away on {presence_date.strftime('%d/%m/%Y')}.\nFIX: Apply on/after {safe_app.strftime('%d/%m/%Y')}.")
 
         return "\n\n".join(solutions) if solutions else ""
 
-    def run_sim(self, current_trips, bc_eligible):
+    def run_sim(self, current_trips, bc_eligible, today=None):
+        """
+        Finds the user's remaining 'Travel Budget': the longest trip of d days
+        (leaving tomorrow, returning d days later) that breaks no rule.
+        Each rule leaves a fixed amount of headroom, so the budget is computed
+        directly instead of re-running getStats for every candidate length.
+        Returns (max_safe, limit_reason).
+        """
+        today = today or datetime.now()
+        # The sweep engines work in whole days; the reference loop also sees the time of day
+        when = today if self.mode == "reference" else today.toordinal()
+        return self.cache.lookup(("run_sim", trip_fingerprint(current_trips), bc_eligible, when),
+                                 lambda: self._run_sim(current_trips, bc_eligible, today))
+
+    def _run_sim(self, current_trips, bc_eligible, today):
+        if self.mode == "reference":
+            return self.run_sim_reference(list(current_trips), bc_eligible, today)
+
+        current_trips = TripTable.fromTrips(current_trips)
+        departure = today.toordinal() + 1
+        ilr = self.backend.ilr_headroom(absence_intervals(current_trips), departure)
+        return self._travelBudget(departure, ilr, self.getBCTotals(current_trips, bc_eligible), bc_eligible)
+
+    @staticmethod
+    def _travelBudget(departure, ilr, bc_totals, bc_eligible):
+        """Turns per-rule headroom into run_sim's (max_safe, limit_reason)."""
+        total_bc, final_bc = bc_totals
+
+        def bc_headroom(used, limit, window_start):
+            if used > limit: return -1
+            if departure > window_start.toordinal(): return limit - used
+            return BC_TOTAL_LIMIT # the trip falls outside this look-back window
+
+        # A d-day trip adds d-1 absence days, so headroom h allows d = h + 1.
+        caps = [
+            (ilr + 1, "Hit ILR 180-Day Rolling Limit"),
+            (bc_headroom(total_bc, BC_TOTAL_LIMIT, bc_eligible - timedelta(days=5*365.25)) + 1, "Hit BC 450-Day 5-Year Limit"),
+            (bc_headroom(final_bc, BC_FINAL_LIMIT, bc_eligible - timedelta(days=365)) + 1, "Hit BC 90-Day Final Year Limit"),
+        ]
+        max_safe = min(BC_TOTAL_LIMIT, min(cap for cap, _ in caps)) # Cap at 450 days (BC limit)
+        if max_safe == BC_TOTAL_LIMIT:
+            return max_safe, "No upcoming constraints found."
+        return max_safe, next(reason for cap, reason in caps if cap == max_safe)
+
+    def getBudgetCalendar(self, trips, bc_eligible, start=None, days=3*365):
+        """
+        TRAVEL BUDGET CALENDAR:
+        For every departure date in [start, start + days), the longest safe trip
+        leaving that day and the rule that limits it, i.e. run_sim answered for
+        every day at once. One sliding pass over the days (see
+        ilr_headroom_calendar) replaces `days` separate simulations.
+        `start` defaults to tomorrow. Returns a list of (date, max_safe, limit_reason).
+        """
+        start = start or datetime.now() + timedelta(days=1)
+        calendar = self.cache.lookup(("getBudgetCalendar", trip_fingerprint(trips), bc_eligible, start.toordinal(), days),
+                                     lambda: tuple(self._getBudgetCalendar(trips, bc_eligible, start, days)))
+        return list(calendar)
+
+    def _getBudgetCalendar(self, trips, bc_eligible, start, days):
+        first = start.toordinal()
+        if self.mode == "reference":
+            return [(datetime.fromordinal(first + i),) + self.run_sim(trips, bc_eligible, datetime.fromordinal(first + i - 1))
+                    for i in range(days)]
+
+        trips = TripTable.fromTrips(trips)
+        bc_totals = self.getBCTotals(trips, bc_eligible)
+        headroom = ilr_headroom_calendar(absence_intervals(trips), first, days)
+        return [(datetime.fromordinal(first + i),) + self._travelBudget(first + i, ilr, bc_totals, bc_eligible)
+                for i, ilr in enumerate(headroom)]
+
+    def run_sim_reference(self, current_trips, bc_eligible, today=None):
         """
         A 'Brute Force' simulator to find the user's remaining 'Travel Budget'.
         It adds 1 day at a time until a rule is broken.
         """
-        today = datetime.now()
+        today = today or datetime.now()
         max_safe = 0
         limit_reason = "No upcoming constraints found." 
         
@@ -107,4 +673,153 @@ class LogicEngine:
             if sim_bc_final > 90: limit_reason = "Hit BC 90-Day Final Year Limit"; break
             max_safe = d
 
-        return max_safe, limit_reason
\ No newline at end of file
+        return max_safe, limit_reason
+
+
+class _Fenwick:
+    """Binary indexed tree: point add and prefix sum in O(log n)."""
+    def __init__(self, size):
+        self.tree = [0] * (size + 1)
+
+    def add(self, i, delta):
+        i += 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        """Sum of positions [0, i)."""
+        total = 0
+        i = min(i, len(self.tree) - 1)
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+class _WindowUsage:
+    """
+    One view of the absence history, kept up to date incrementally.
+    Holds the per-day absence count, the usage of every 365-day window
+    starting inside [lo, hi], per-block maxima of those windows and a
+    Fenwick tree of absence days keyed by the first absent day.
+    """
+    BLOCK = 64
+    MARGIN = 2 * ROLLING_WINDOW
+
+    def __init__(self):
+        self.intervals = [] # sorted (first, last) day ordinals
+        self.lo = self.hi = None
+        self.counts, self.windows, self.block_max = [], [], []
+        self.firsts = None
+
+    def _rebuild(self, lo, hi):
+        """Re-lays the arrays over [lo, hi]; amortised by the growth margin."""
+        self.lo, self.hi = lo, hi
+        size = hi - lo + 1
+        prefix = absence_prefix(self.intervals, lo, hi)
+        self.counts = [prefix[i + 1] - prefix[i] for i in range(size)]
+        self.windows = [prefix[min(i + ROLLING_WINDOW, size)] - prefix[i] for i in range(size)]
+        self.block_max = [max(self.windows[i:i + self.BLOCK]) for i in range(0, size, self.BLOCK)]
+        self.firsts = _Fenwick(size)
+        for first, last in self.intervals:
+            self.firsts.add(first - lo, last - first + 1)
+
+    def _apply(self, first, last, delta):
+        lo, window = self.lo, ROLLING_WINDOW
+        for d in range(first - lo, last - lo + 1):
+            self.counts[d] += delta
+
+        # Only windows overlapping [first, last] change
+        start, end = max(first - window + 1, lo), last
+        for s in range(start, end + 1):
+            overlap = min(last, s + window - 1) - max(first, s) + 1
+            self.windows[s - lo] += delta * overlap
+        for b in range((start - lo) // self.BLOCK, (end - lo) // self.BLOCK + 1):
+            self.block_max[b] = max(self.windows[b * self.BLOCK:(b + 1) * self.BLOCK])
+        self.firsts.add(first - lo, delta * (last - first + 1))
+
+    def add(self, interval):
+        insort(self.intervals, interval)
+        first, last = interval
+        if self.lo is None or first < self.lo or last > self.hi:
+            lo = first if self.lo is None else min(first, self.lo)
+            hi = last if self.hi is None else max(last, self.hi)
+            self._rebuild(lo - self.MARGIN, hi + self.MARGIN)
+        else:
+            self._apply(first, last, 1)
+
+    def remove(self, interval):
+        i = bisect_left(self.intervals, interval)
+        if i == len(self.intervals) or self.intervals[i] != interval:
+            raise ValueError(f"Interval {interval} is not tracked")
+        del self.intervals[i]
+        self._apply(*interval, -1)
+
+    def rollingMax(self):
+        return max(self.block_max) if self.block_max else 0
+
+    def absentSince(self, threshold):
+        """Absence days of trips that departed after day ordinal `threshold`."""
+        if self.lo is None:
+            return 0
+        # departure > threshold  <=>  first absent day >= threshold + 2
+        return self.firsts.prefix(len(self.counts)) - self.firsts.prefix(threshold + 2 - self.lo)
+
+
+class ResidencyState:
+    """
+    Incremental alternative to calling LogicEngine.getStats after every change.
+    Keeps a confirmed-only view and a with-what-ifs view; adding, removing or
+    replacing one trip only touches the windows that overlap it, and toggling
+    a trip's what-if flag leaves the with-what-ifs view untouched.
+    Trips in a named scenario are alternatives, so they are left out of both views.
+    """
+    def __init__(self, trips=()):
+        self.reset(trips)
+
+    def reset(self, trips):
+        self.confirmed, self.everything = _WindowUsage(), _WindowUsage()
+        for t in trips:
+            self.add(t)
+
+    @staticmethod
+    def _interval(trip):
+        if trip.scenario: return None
+        first, last = trip.departure.toordinal() + 1, trip.return_date.toordinal() - 1
+        return (first, last) if first <= last else None
+
+    def add(self, trip):
+        interval = self._interval(trip)
+        if interval is None: return
+        self.everything.add(interval)
+        if not trip.is_what_if:
+            self.confirmed.add(interval)
+
+    def remove(self, trip):
+        interval = self._interval(trip)
+        if interval is None: return
+        self.everything.remove(interval)
+        if not trip.is_what_if:
+            self.confirmed.remove(interval)
+
+    def replace(self, old, new):
+        if self._interval(old) == self._interval(new):
+            # Same dates: only the confirmed view can change (what-if toggle)
+            interval = self._interval(new)
+            if interval is not None and old.is_what_if != new.is_what_if:
+                if new.is_what_if: self.confirmed.remove(interval)
+                else: self.confirmed.add(interval)
+            return
+        self.remove(old)
+        self.add(new)
+
+    def getStats(self, bc_eligible, include_what_if=True):
+        """Same (max_r, total_bc, final_bc) contract as LogicEngine.getStats."""
+        count("ResidencyState.getStats")
+        view = self.everything if include_what_if else self.confirmed
+        bc_5yr_start = bc_eligible - timedelta(days=5*365.25)
+        bc_final_start = bc_eligible - timedelta(days=365)
+        return (view.rollingMax(),
+                view.absentSince(bc_5yr_start.toordinal()),
+                view.absentSince(bc_final_start.toordinal()))
@@ -0,0 +1,116 @@
+"""
+Project: BNO Settlement & Citizenship Tracker
+Author: Kimi Tang
+Date: February 2026
+License: MIT
+Description: Side-by-side evaluation of named what-if scenarios.
+
+A scenario is the confirmed history plus the what-if trips carrying one
+`scenario` name (unnamed what-ifs form a scenario of their own). Scenarios
+are alternatives, so their trips are never added together. The confirmed
+history is converted to a TripTable once and handed to every worker, which
+only appends its scenario's few trips before running the engine.
+"""
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from logic import BC_FINAL_LIMIT, BC_TOTAL_LIMIT, ILR_LIMIT, LogicEngine, TripTable
+
+BASELINE = "(confirmed only)"
+UNNAMED = "What-If"
+_NEVER = datetime.max # sorts a missing application date last
+
+
+@dataclass(frozen=True)
+class ScenarioResult:
+    name: str
+    trips: int              # what-if trips in the scenario
+    ilr_max: int
+    bc_total: int
+    bc_final: int
+    max_safe: int           # longest safe trip leaving tomorrow
+    limit_reason: str
+    earliest_ilr: datetime  # earliest valid application dates, or None
+    earliest_bc: datetime
+    breaches: tuple
+
+RANKINGS = {
+    "overall": lambda r: (len(r.breaches), r.earliest_bc or _NEVER, r.ilr_max, r.bc_total, -r.max_safe),
+    "ilr_max": lambda r: (r.ilr_max, r.bc_total),
+    "bc_total": lambda r: (r.bc_total, r.bc_final),
+    "budget": lambda r: -r.max_safe,
+    "earliest": lambda r: (r.earliest_bc or _NEVER, r.earliest_ilr or _NEVER),
+}
+
+def rank(results, by="overall"):
+    """Results best-first by one of RANKINGS; ties keep name order."""
+    return sorted(results, key=lambda r: (RANKINGS[by](r), r.name))
+
+def group_scenarios(trips):
+    """(confirmed TripTable, {scenario name: [(departure, return) ordinals]})."""
+    confirmed, groups = TripTable(), {}
+    for t in trips:
+        dep, ret = t.departure.toordinal(), t.return_date.toordinal()
+        if t.scenario:
+            groups.setdefault(t.scenario, []).append((dep, ret))
+        elif t.is_what_if:
+            groups.setdefault(UNNAMED, []).append((dep, ret))
+        else:
+            confirmed.append(dep, ret)
+    return confirmed, groups
+
+def evaluate_scenario(engine, confirmed, name, rows, ilr_date, bc_date, today=None):
+    """Runs one scenario (confirmed + `rows`) through `engine`. `confirmed` is left untouched."""
+    table = TripTable()
+    table.departures, table.returns = array('i', confirmed.departures), array('i', confirmed.returns)
+    table.what_if = bytearray(confirmed.what_if)
+    for dep, ret in rows:
+        table.append(dep, ret, True)
+
+    max_r, total_bc, final_bc = engine.getStats(table, bc_date)
+    max_safe, limit = engine.run_sim(table, bc_date, today)
+    breaches = tuple(rule for rule, failed in (
+        ("ILR_ROLLING", max_r > ILR_LIMIT), ("BC_TOTAL", total_bc > BC_TOTAL_LIMIT),
+        ("BC_FINAL", final_bc > BC_FINAL_LIMIT),
+        ("BC_PRESENCE", table.tripCovering(bc_date - timedelta(days=5*365)) is not None)) if failed)
+    return ScenarioResult(
+        name=name, trips=len(rows), ilr_max=max_r, bc_total=total_bc, bc_final=final_bc,
+        max_safe=max_safe, limit_reason=limit,
+        earliest_ilr=engine.getEarliestApplication(table, ilr_date, "ILR").earliest,
+        earliest_bc=engine.getEarliestApplication(table, bc_date, "BC").earliest,
+        breaches=breaches)
+
+# Per-process worker state, set once by the pool initializer
+_ENGINE = _CONFIRMED = None
+
+def _init_worker(mode, confirmed):
+    global _ENGINE, _CONFIRMED
+    _ENGINE, _CONFIRMED = LogicEngine(mode, cache_size=0), confirmed
+
+def _run(name, rows, ilr_date, bc_date, today):
+    return evaluate_scenario(_ENGINE, _CONFIRMED, name, rows, ilr_date, bc_date, today)
+
+def compare_scenarios(trips, ilr_date, bc_date, today=None, mode="sweep", workers=None, by="overall",
+                      mp_context=None):
+    """
+    Evaluates the baseline and every scenario in `trips` and returns ranked
+    ScenarioResults. Runs in a process pool when there is more than a couple of
+    scenarios and more than one core; otherwise serially in this process.
+    `mp_context` picks how the pool starts its workers (see multiprocessing.get_context).
+    """
+    confirmed, groups = group_scenarios(trips)
+    jobs = [(BASELINE, [])] + sorted(groups.items())
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+
+    if workers <= 1 or len(jobs) <= 2:
+        engine = LogicEngine(mode, cache_size=0)
+        results = [evaluate_scenario(engine, confirmed, name, rows, ilr_date, bc_date, today) for name, rows in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                 initializer=_init_worker, initargs=(mode, confirmed)) as pool:
+            futures = [pool.submit(_run, name, rows, ilr_date, bc_date, today) for name, rows in jobs]
+            results = [f.result() for f in futures]
+    return rank(results, by)
@@ -0,0 +1,272 @@
+"""
+Project: BNO Settlement & Citizenship Tracker
+Author: Kimi Tang
+Date: February 2026
+License: MIT
+Description: Local JSON-over-HTTP compliance service.
+
+    python -m service [--host 127.0.0.1] [--port 8765] [--workers N]
+
+    POST /milestones  {"visa_date": "DD/MM/YYYY"}
+    POST /stats       {"visa_date": "...", "trips": [...]}
+    POST /budget      {"visa_date": "...", "trips": [...], "today": "DD/MM/YYYY"}  (today optional)
+    POST /advice      {"visa_date": "...", "trips": [...]}
+    GET  /health
+
+Trips use the trips_data.json schema. Responses carry the same sections as
+`python -m cli` (see cli.SECTIONS), or {"error": ...} with status 400.
+
+The event loop only does HTTP. Request bodies are handed, still encoded, to a
+process pool in small batches (one pickle round trip per batch, not per
+request). Identical requests that arrive while one is being computed share
+its result, and finished responses are kept in an LRU cache for the day.
+Standard library only; meant for localhost, not for the open internet.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import signal
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+
+from cli import SECTIONS, evaluate
+from storage import trip_from_dict
+
+ENDPOINTS = ("milestones", "stats", "budget", "advice")
+MAX_BODY = 16 * 1024 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+# --- Worker side (runs in the pool processes) ---
+
+_ENGINE = None
+
+def _init_worker(mode, cache_size):
+    global _ENGINE
+    from logic import LogicEngine
+    _ENGINE = LogicEngine(mode, cache_size=cache_size)
+
+def compute(endpoint, body):
+    """One request: (status, JSON-ready dict). Never raises."""
+    try:
+        payload = json.loads(body)
+        visa = payload["visa_date"]
+        if endpoint == "milestones":
+            ilr_date, bc_date = _ENGINE.getMilestoneDates(visa)
+            if not ilr_date:
+                raise ValueError(f"Invalid visa date {visa!r} (expected DD/MM/YYYY)")
+            return 200, {"visa_date": visa, "ilr_eligible": ilr_date.strftime("%Y-%m-%d"),
+                         "bc_eligible": bc_date.strftime("%Y-%m-%d")}
+        trips = [trip_from_dict(item) for item in payload["trips"]]
+        today = datetime.strptime(payload["today"], "%d/%m/%Y") if payload.get("today") else None
+        report, _ = evaluate(_ENGINE, trips, visa, today, {endpoint})
+        return 200, {k: report[k] for k in SECTIONS[endpoint] if k in report}
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return 400, {"error": f"{type(e).__name__}: {e}"}
+    except Exception as e:
+        return 500, {"error": f"{type(e).__name__}: {e}"}
+
+def compute_batch(jobs):
+    """[(endpoint, body)] -> [(status, encoded response)]; encoding here keeps the event loop free."""
+    return [(status, json.dumps(result).encode()) for status, result in (compute(e, b) for e, b in jobs)]
+
+
+# --- Server side (event loop) ---
+
+class ComplianceService:
+    def __init__(self, workers=None, mode="sweep", cache_size=1024, batch_ms=2.0, batch_max=32):
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+        self.pool = self.new_pool()
+        self.cache = OrderedDict() # key -> (status, response bytes)
+        self.cache_size = cache_size
+        self.inflight = {}         # key -> Future shared by identical requests
+        self.batch_ms, self.batch_max = batch_ms, batch_max
+        self.queue = []            # (endpoint, body, key, future) waiting for the next batch
+        self.flush_handle = None
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "batches": 0, "computed": 0,
+                      "pool_restarts": 0}
+
+    def new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.mode, 256))
+
+    def restart_pool(self, broken):
+        """Replaces `broken` (a worker died: OOM, kill...) unless that already happened."""
+        if self.pool is not broken: return
+        self.stats["pool_restarts"] += 1
+        broken.shutdown(wait=False)
+        self.pool = self.new_pool()
+
+    def close(self):
+        self.pool.shutdown(wait=True) # reaps the workers, which would otherwise outlive the server
+
+    async def handle(self, endpoint, body):
+        """(status, response bytes) for one request, via the cache, an in-flight twin, or a batch."""
+        self.stats["requests"] += 1
+        # Responses only depend on the body and, for an implicit "today", the date
+        key = (endpoint, date.today().toordinal(), hashlib.blake2b(body, digest_size=16).digest())
+        hit = self.cache.get(key)
+        if hit is not None:
+            self.cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return hit
+        future = self.inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        self.queue.append((endpoint, body, key, future))
+        if len(self.queue) >= self.batch_max:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.batch_ms / 1000, self.flush)
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            if self.inflight.get(key) is future: # fail() may already have let a retry take the key
+                del self.inflight[key]
+        if result[0] in (200, 400): # deterministic; 500s are retried
+            self.cache[key] = result
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
+
+    def flush(self):
+        """Sends everything queued so far to the pool as one batch."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.queue = self.queue, []
+        if not batch: return
+        self.stats["batches"] += 1
+        self.stats["computed"] += len(batch)
+        pool = self.pool
+        try:
+            task = asyncio.get_running_loop().run_in_executor(pool, compute_batch, [(e, b) for e, b, _, _ in batch])
+        except BrokenProcessPool as e: # a worker died since the last batch; submit() refuses work
+            self.fail(batch, e) # answer first, so nothing in restart_pool can strand the batch
+            self.restart_pool(pool)
+            return
+
+        def done(task):
+            try:
+                results = task.result()
+            except Exception as e: # broken pool mid-batch, pickling error...
+                self.fail(batch, e)
+                if isinstance(e, BrokenProcessPool):
+                    self.restart_pool(pool)
+                return
+            for (_, _, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        task.add_done_callback(done)
+
+    def fail(self, batch, exc):
+        """Answers every request of `batch` (and its coalesced twins) with a 500; 500s are not cached."""
+        result = (500, json.dumps({"error": f"{type(exc).__name__}: {exc}"}).encode())
+        for _, _, key, future in batch:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+            if not future.done():
+                future.set_result(result)
+
+    async def serve_client(self, reader, writer):
+        """One connection; HTTP/1.1 keep-alive, one request at a time."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self.respond(writer, 400, b'{"error": "Malformed request line"}', False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and (version == "HTTP/1.1" or headers.get("connection", "").lower() == "keep-alive"))
+                try:
+                    length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY:
+                    await self.respond(writer, 413 if length > MAX_BODY else 400, b'{"error": "Bad Content-Length"}', False)
+                    return
+                body = await reader.readexactly(length) if length else b""
+
+                status, response = await self.route(method, target.split("?", 1)[0].strip("/"), body)
+                await self.respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if path == "health":
+            return 200, json.dumps({"status": "ok", **self.stats, "cache_size": len(self.cache)}).encode()
+        if path not in ENDPOINTS:
+            return 404, b'{"error": "Unknown endpoint"}'
+        if method != "POST":
+            return 405, b'{"error": "Use POST with a JSON body"}'
+        return await self.handle(path, body)
+
+    @staticmethod
+    async def respond(writer, status, body, keep_alive):
+        writer.write((f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                      f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + body)
+        await writer.drain()
+
+async def serve(host="127.0.0.1", port=8765, **options):
+    service = ComplianceService(**options)
+    server = await asyncio.start_server(service.serve_client, host, port)
+    print(f"Compliance service on http://{host}:{port} ({service.workers} workers)", file=sys.stderr)
+
+    # Stop cleanly on Ctrl+C or SIGTERM so the worker pool is shut down too
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: stopped.done() or stopped.set_result(None))
+        except (NotImplementedError, RuntimeError): # Windows: Ctrl+C still raises KeyboardInterrupt
+            pass
+    try:
+        async with server:
+            await stopped
+    finally:
+        service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m service", description="Local BNO compliance HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--engine", default="sweep", choices=["auto", "sweep", "numpy", "reference"])
+    parser.add_argument("--cache", type=int, default=1024, help="responses kept in the LRU cache (0 disables)")
+    parser.add_argument("--batch-ms", type=float, default=2.0, help="how long a batch waits to fill up")
+    parser.add_argument("--batch-max", type=int, default=32, help="requests per batch")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, mode=args.engine, cache_size=args.cache,
+                          batch_ms=args.batch_ms, batch_max=args.batch_max))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Project: BNO Settlement & Citizenship Tracker
+Author: Kimi Tang
+Date: February 2026
+License: MIT
+Description: Trip persistence: the trips_data.json history format, and an
+SQLite database that is written one trip at a time.
+"""
+import json
+import os
+import stat
+import sqlite3
+import tempfile
+from datetime import datetime
+
+from logic import Trip
+
+
+def trip_to_dict(t):
+    """Trip obj to dict (datetime -> str). "scenario" is only written when set."""
+    item = {
+        "departure": t.departure.isoformat(),
+        "return_date": t.return_date.isoformat(),
+        "is_what_if": t.is_what_if
+    }
+    if t.scenario:
+        item["scenario"] = t.scenario
+    return item
+
+def trip_from_dict(item):
+    """Dict to Trip obj. A trip in a named scenario is always a what-if."""
+    if not isinstance(item, dict):
+        raise TypeError(f"Expected a trip object, got {type(item).__name__}")
+    scenario = item.get("scenario", "")
+    return Trip(
+        departure=datetime.fromisoformat(item["departure"]),
+        return_date=datetime.fromisoformat(item["return_date"]),
+        is_what_if=bool(item["is_what_if"] or scenario),
+        scenario=scenario
+    )
+
+# Read once at import, before any worker thread exists: os.umask can only be read by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def save_trips(trips, filename="trips_data.json"):
+    """
+    Serialises trips to the JSON history format.
+    Written to a temporary file and renamed over the target, so a crash
+    mid-write leaves the previous file intact.
+    """
+    folder = os.path.dirname(os.path.abspath(filename))
+    try:
+        mode = stat.S_IMODE(os.stat(filename).st_mode)
+    except FileNotFoundError: # what open() would have used
+        mode = 0o666 & ~_UMASK
+    fd, tmp = tempfile.mkstemp(prefix=".trips-", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w") as f: # owns fd from here on, so it is closed on any failure
+            os.chmod(tmp, mode) # mkstemp creates 0600, which os.replace would keep
+            json.dump([trip_to_dict(t) for t in trips], f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filename)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+def load_trips(filename="trips_data.json"):
+    """Parses a JSON history file into a list of Trip objects."""
+    with open(filename, "r") as f:
+        raw_data = json.load(f)
+    return [trip_from_dict(item) for item in raw_data]
+
+
+class TripDatabase:
+    """
+    SQLite trip store. Trips are rows of integer day ordinals with an index on
+    departure, so every add/edit/delete is one small transaction instead of a
+    whole-file rewrite, and date-range reads use the index.
+    Ordinals keep the date only; the app never records a time of day.
+    Row IDs are stable and are used as TripStore IDs by the app.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS trips (
+            id          INTEGER PRIMARY KEY,
+            departure   INTEGER NOT NULL,
+            return_date INTEGER NOT NULL,
+            is_what_if  INTEGER NOT NULL DEFAULT 0,
+            scenario    TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS trips_departure ON trips (departure);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    def __init__(self, filename="trips.db"):
+        self.filename = filename
+        self.conn = sqlite3.connect(filename)
+        self.conn.execute("PRAGMA journal_mode=WAL") # readers never block the writer
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(self.SCHEMA)
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(trips)")}
+            if "scenario" not in columns: # databases created before named scenarios
+                self.conn.execute("ALTER TABLE trips ADD COLUMN scenario TEXT NOT NULL DEFAULT ''")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM trips").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _row(t):
+        return t.departure.toordinal(), t.return_date.toordinal(), int(t.is_what_if), t.scenario
+
+    @staticmethod
+    def _trip(row):
+        dep, ret, what_if, scenario = row
+        return Trip(departure=datetime.fromordinal(dep), return_date=datetime.fromordinal(ret),
+                    is_what_if=bool(what_if or scenario), scenario=scenario)
+
+    def add(self, trip):
+        """Inserts one trip and returns its row ID."""
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO trips (departure, return_date, is_what_if, scenario) VALUES (?, ?, ?, ?)", self._row(trip))
+        return cur.lastrowid
+
+    def add_many(self, trips):
+        """Inserts trips in one transaction and returns their row IDs in order."""
+        with self.conn:
+            return [self.conn.execute("INSERT INTO trips (departure, return_date, is_what_if, scenario) VALUES (?, ?, ?, ?)",
+                                      self._row(t)).lastrowid for t in trips]
+
+    def update(self, trip_id, trip):
+        with self.conn:
+            cur = self.conn.execute(
+                "UPDATE trips SET departure = ?, return_date = ?, is_what_if = ?, scenario = ? WHERE id = ?",
+                (*self._row(trip), trip_id))
+        if not cur.rowcount:
+            raise KeyError(trip_id)
+
+    def remove(self, *trip_ids):
+        with self.conn:
+            self.conn.executemany("DELETE FROM trips WHERE id = ?", [(i,) for i in trip_ids])
+
+    def replace_all(self, trips):
+        """Swaps the whole history in one transaction. Returns [(id, Trip)] in departure order."""
+        trips = sorted(trips, key=lambda t: t.departure)
+        with self.conn:
+            self.conn.execute("DELETE FROM trips")
+            self.conn.executemany("INSERT INTO trips (departure, return_date, is_what_if, scenario) VALUES (?, ?, ?, ?)",
+                                  map(self._row, trips))
+        return self.items()
+
+    def items(self):
+        """(id, Trip) pairs in departure order."""
+        rows = self.conn.execute("SELECT id, departure, return_date, is_what_if, scenario FROM trips ORDER BY departure, id")
+        return [(row[0], self._trip(row[1:])) for row in rows]
+
+    def between(self, start, end):
+        """
+        (id, Trip) pairs absent at some point in [start, end], e.g. the last five years.
+        The departure index bounds the scan; the return check drops trips that ended before start.
+        """
+        rows = self.conn.execute(
+            "SELECT id, departure, return_date, is_what_if, scenario FROM trips "
+            "WHERE departure < ? AND return_date > ? ORDER BY departure, id",
+            (end.toordinal(), start.toordinal()))
+        return [(row[0], self._trip(row[1:])) for row in rows]
+
+    def migrate_json(self, filename="trips_data.json"):
+        """
+        One-time import of a JSON history into an empty database.
+        Returns the number of trips imported (0 if already migrated or no file).
+        """
+        with self.conn:
+            if self.conn.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone():
+                return 0
+            if len(self) or not os.path.exists(filename):
+                self.conn.execute("INSERT INTO meta VALUES ('migrated_from', '')")
+                return 0
+            trips = load_trips(filename)
+            self.conn.executemany("INSERT INTO trips (departure, return_date, is_what_if, scenario) VALUES (?, ?, ?, ?)",
+                                  map(self._row, sorted(trips, key=lambda t: t.departure)))
+            self.conn.execute("INSERT INTO meta VALUES ('migrated_from', ?)", (os.path.abspath(filename),))
+        return len(trips)
@@ -0,0 +1,86 @@
+"""
+Project: BNO Settlement & Citizenship Tracker
+Author: Kimi Tang
+Date: February 2026
+License: MIT
+Description: Departure-ordered trip storage with stable trip IDs.
+"""
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+
+class TripStore:
+    """
+    Holds the absence log keyed by a stable integer ID.
+    Trips are also indexed by (departure, id) so lookups by date use bisect
+    instead of scanning and formatting every trip. Iterating the store yields
+    Trip objects in departure order, so it can be handed to LogicEngine as-is.
+    """
+    def __init__(self, trips=()):
+        self._next_id = 1    # auto IDs always stay above every ID used so far
+        self._trips = {}     # id -> Trip
+        self._order = []     # sorted (departure, id)
+        self._max_span = timedelta(0) # longest trip seen; bounds the overlap scan
+        for t in trips:
+            self.add(t)
+
+    def __len__(self):
+        return len(self._trips)
+
+    def __iter__(self):
+        return (self._trips[i] for _, i in self._order)
+
+    def __contains__(self, trip_id):
+        return trip_id in self._trips
+
+    def items(self, start=0, stop=None):
+        """(id, Trip) pairs in departure order, optionally just positions [start, stop)."""
+        return [(i, self._trips[i]) for _, i in self._order[start:stop]]
+
+    def get(self, trip_id):
+        return self._trips[trip_id]
+
+    def add(self, trip, trip_id=None):
+        """Stores a trip and returns its ID. O(log n) search plus list insert."""
+        if trip_id is None:
+            trip_id = self._next_id
+        elif trip_id in self._trips:
+            raise KeyError(f"Trip ID {trip_id} already in use")
+        self._next_id = max(self._next_id, trip_id + 1)
+        self._trips[trip_id] = trip
+        insort(self._order, (trip.departure, trip_id))
+        self._max_span = max(self._max_span, trip.return_date - trip.departure)
+        return trip_id
+
+    def remove(self, trip_id):
+        """Removes one trip by ID and returns it."""
+        trip = self._trips.pop(trip_id)
+        del self._order[bisect_left(self._order, (trip.departure, trip_id))]
+        return trip
+
+    def replace(self, trip_id, trip):
+        """Swaps the trip stored under `trip_id`, keeping the ID. Returns the old trip."""
+        old = self.remove(trip_id)
+        self.add(trip, trip_id)
+        return old
+
+    def clear(self):
+        self._trips.clear()
+        self._order.clear()
+        self._max_span = timedelta(0)
+
+    def overlapping(self, departure, return_date, exclude=None):
+        """
+        (id, Trip) pairs that overlap [departure, return_date).
+        Overlap Logic: StartA < EndB AND StartB < EndA, so adjoining trips are allowed.
+        Only trips departing in (departure - longest trip, return_date) can overlap,
+        which bisect finds in O(log n) before checking the few candidates.
+        """
+        lo = bisect_left(self._order, (departure - self._max_span,))
+        hi = bisect_left(self._order, (return_date,))
+        hits = []
+        for dep, i in self._order[lo:hi]:
+            trip = self._trips[i]
+            if i != exclude and departure < trip.return_date and dep < return_date:
+                hits.append((i, trip))
+        return hits
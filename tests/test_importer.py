@@ -0,0 +1,110 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from importer import DATE_FORMATS, ImportResult, import_file, merge_trips, parse_date, parse_rows
+from logic import Trip
+
+
+def day(d, m=1, y=2024):
+    return datetime(y, m, d)
+
+def strptime_date(text):
+    for fmt in DATE_FORMATS:
+        try: return datetime.strptime(text.strip(), fmt)
+        except ValueError: continue
+    return None
+
+@pytest.mark.parametrize("text, expected", [
+    ("07/08/2024", day(7, 8)),
+    ("7/8/2024", day(7, 8)),
+    (" 07/08/24 ", day(7, 8)),
+    ("2024-08-07", day(7, 8)),
+    ("2024-08-07T00:00:00", day(7, 8)),
+    ("001/02/2024", None),
+    ("01/002/2024", None),
+    ("31/02/2024", None),
+    ("2024-08-07T10:30:00", None),
+    ("2024-08-07T00:00:00+01:00", None),
+    ("", None),
+    ("tomorrow", None),
+])
+def test_parse_date(text, expected):
+    assert parse_date(text) == expected
+
+@pytest.mark.parametrize("seed", range(5))
+def test_fast_path_agrees_with_strptime(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        parts = [str(rng.randint(0, 40)).zfill(rng.randint(1, 3)), str(rng.randint(0, 14)).zfill(rng.randint(1, 3)),
+                 str(rng.randint(1990, 2030))]
+        text = "/".join(parts)
+        assert parse_date(text) == strptime_date(text), text
+
+ROWS = [
+    (2, "01/01/2024", "10/01/2024", ""),   # kept
+    (3, "10/01/2024", "20/01/2024", ""),   # adjoining line 2: kept and flagged
+    (4, "01/01/2024", "10/01/2024", ""),   # duplicate of line 2
+    (5, "05/01/2024", "08/01/2024", ""),   # inside line 2
+    (6, "01/03/2024", "10/03/2024", ""),   # overlaps an existing trip
+    (7, "20/04/2024", "10/04/2024", ""),   # return before departure
+    (8, "31/02/2024", "10/03/2024", ""),   # no such date
+    (9, "01/05/2024", "10/05/2024", "yes"),
+]
+EXISTING = [Trip(departure=day(5, 3), return_date=day(15, 3))]
+
+def run(merge):
+    result = ImportResult()
+    return merge_trips(parse_rows(ROWS, result), EXISTING, merge, result)
+
+def test_conflicts_are_classified():
+    result = run(merge=False)
+    assert [(c["line"], c["problem"]) for c in result.conflicts] == [
+        (3, "adjoining"), (4, "duplicate"), (5, "overlaps_import"), (6, "overlaps_existing"),
+        (7, "invalid_dates"), (8, "invalid_dates")]
+    assert result.accepted == [
+        Trip(departure=day(1), return_date=day(10)), Trip(departure=day(10), return_date=day(20)),
+        Trip(departure=day(1, 5), return_date=day(10, 5), is_what_if=True)]
+    assert result.rows == 8 and result.merged == 0
+
+def test_merge_folds_overlapping_and_adjoining_rows():
+    result = run(merge=True)
+    assert [(c["line"], c["problem"]) for c in result.conflicts] == [
+        (6, "overlaps_existing"), (7, "invalid_dates"), (8, "invalid_dates")]
+    assert result.merged == 3
+    merged = result.accepted[0]
+    assert merged == Trip(departure=day(1), return_date=day(20))
+    assert merged.daysAbsent == 18 # the shared 10/01 now counts: 8 + 9 + 1
+
+def test_merge_keeps_confirmed_and_what_if_apart():
+    parsed = [(1, Trip(departure=day(1), return_date=day(10))),
+              (2, Trip(departure=day(5), return_date=day(15), is_what_if=True))]
+    result = merge_trips(parsed, merge=True)
+    assert result.merged == 0
+    assert [(c["line"], c["problem"]) for c in result.conflicts] == [(2, "overlaps_import")]
+
+def test_import_file_csv_and_jsonl(tmp_path):
+    csv_file = tmp_path / "trips.csv"
+    csv_file.write_text("Start,Back,Planned\n01/01/2024,10/01/2024,\n2024-02-01,2024-02-05,yes\n")
+    result = import_file(csv_file)
+    assert result.accepted == [Trip(departure=day(1), return_date=day(10)),
+                               Trip(departure=day(1, 2), return_date=day(5, 2), is_what_if=True)]
+
+    jsonl_file = tmp_path / "trips.jsonl"
+    jsonl_file.write_text('{"departure": "2024-01-01T00:00:00", "return_date": "2024-01-10T00:00:00", "is_what_if": false}\n'
+                          'not json\n')
+    result = import_file(jsonl_file)
+    assert result.accepted == [Trip(departure=day(1), return_date=day(10))]
+    assert [c["problem"] for c in result.conflicts] == ["unreadable"]
+
+def test_random_rows_never_overlap_once_merged():
+    rng = random.Random(0)
+    parsed = []
+    for line in range(300):
+        dep = day(1) + timedelta(days=rng.randrange(400))
+        parsed.append((line, Trip(departure=dep, return_date=dep + timedelta(days=rng.randint(1, 20)))))
+    accepted = merge_trips(parsed, merge=True).accepted
+    assert all(a.return_date < b.departure for a, b in zip(accepted, accepted[1:]))
+    covered = lambda trips: {d for t in trips for d in range(t.departure.toordinal(), t.return_date.toordinal() + 1)}
+    assert covered(accepted) == covered(t for _, t in parsed)
@@ -0,0 +1,21 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from logic import Trip
+from store import TripStore
+
+
+def trip(day):
+    dep = datetime(2024, 1, 1) + timedelta(days=day)
+    return Trip(departure=dep, return_date=dep + timedelta(days=3))
+
+def test_auto_ids_skip_explicit_ids():
+    s = TripStore()
+    assert s.add(trip(0), 1) == 1
+    assert s.add(trip(10)) == 2
+    assert s.add(trip(20), 10) == 10
+    assert s.add(trip(30)) == 11
+    assert len(s) == len(s.items()) == 4
+    with pytest.raises(KeyError):
+        s.add(trip(40), 2)
@@ -0,0 +1,92 @@
+"""
+Project: BNO Settlement & Citizenship Tracker
+Author: Kimi Tang
+Date: February 2026
+License: MIT
+Description: NumPy backend for the rolling-window engine.
+
+Mirrors the pure-Python helpers in logic.py (same arguments, same results)
+so LogicEngine can swap them in when NumPy is installed. Intervals are the
+inclusive (first, last) absence day ordinals produced by absence_intervals.
+"""
+import numpy as np
+
+from logic import ROLLING_WINDOW, ILR_LIMIT
+
+
+def _as_array(intervals):
+    return np.asarray(intervals, dtype=np.int64).reshape(-1, 2)
+
+
+def day_counts(intervals, lo, hi):
+    """Per-day absence count over [lo, hi] (np.add.at on a difference array, then cumsum)."""
+    spans = _as_array(intervals)
+    first, last = np.maximum(spans[:, 0], lo), np.minimum(spans[:, 1], hi)
+    keep = first <= last
+    diff = np.zeros(hi - lo + 2, dtype=np.int64)
+    np.add.at(diff, first[keep] - lo, 1)
+    np.add.at(diff, last[keep] - lo + 1, -1)
+    return np.cumsum(diff[:-1])
+
+
+def window_sums(counts, window=ROLLING_WINDOW):
+    """
+    Absence inside every window starting at each index of `counts` (last axis).
+    One prefix-sum difference pass; windows running off the end are clipped.
+    Works on a single vector or a 2-D stack of vectors.
+    """
+    size = counts.shape[-1]
+    prefix = np.zeros(counts.shape[:-1] + (size + 1,), dtype=np.int64)
+    np.cumsum(counts, axis=-1, out=prefix[..., 1:])
+    ends = np.minimum(np.arange(size) + window, size)
+    return prefix[..., ends] - prefix[..., :size]
+
+
+def rolling_max(intervals, window=ROLLING_WINDOW):
+    """Vectorized logic.rolling_max."""
+    spans = _as_array(intervals)
+    if not len(spans):
+        return 0
+    lo, hi = int(spans[:, 0].min()), int(spans[:, 1].max())
+    return int(window_sums(day_counts(spans, lo, hi), window).max())
+
+
+def rolling_max_batch(intervals, candidates, window=ROLLING_WINDOW):
+    """
+    Rolling max of `intervals` plus each candidate interval in turn, as one 2-D
+    computation: row k is the shared base count plus candidate k.
+    A candidate of None adds nothing. Returns a list of ints.
+    """
+    spans = _as_array(intervals)
+    chosen = [(k, c) for k, c in enumerate(candidates) if c is not None]
+    points = [int(v) for v in spans.ravel()] + [v for _, c in chosen for v in c]
+    if not points:
+        return [0] * len(candidates)
+    lo, hi = min(points), max(points)
+    size = hi - lo + 1
+
+    base = day_counts(spans, lo, hi) if len(spans) else np.zeros(size, dtype=np.int64)
+    diff = np.zeros((len(candidates), size + 1), dtype=np.int64)
+    if chosen:
+        rows = np.array([k for k, _ in chosen])
+        cand = _as_array([c for _, c in chosen])
+        np.add.at(diff, (rows, cand[:, 0] - lo), 1)
+        np.add.at(diff, (rows, cand[:, 1] - lo + 1), -1)
+    counts = base + np.cumsum(diff[:, :-1], axis=1)
+    return [int(v) for v in window_sums(counts, window).max(axis=1)]
+
+
+def ilr_headroom(intervals, departure, window=ROLLING_WINDOW, limit=ILR_LIMIT):
+    """Vectorized logic.ilr_headroom: every window near the departure caps the new trip at once."""
+    if rolling_max(intervals, window) > limit:
+        return -1
+
+    lo, hi = departure - window + 2, departure + limit
+    used = window_sums(day_counts(intervals, lo, hi + window - 1), window)[:hi - lo + 1]
+    starts = np.arange(lo, hi + 1)
+    headroom = limit - used
+
+    covering = starts <= departure + 1
+    binding = covering & (starts + window - 1 - departure > headroom)
+    caps = np.where(covering, np.where(binding, headroom, limit), headroom + starts - departure - 1)
+    return int(min(limit, caps.min()))